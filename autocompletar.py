@@ -0,0 +1,83 @@
+"""Índice em memória dos jogos com estoque, para o autocomplete do /buscar.
+
+Por servidor, uma lista ordenada de chaves normalizadas consultada com bisect:
+o nome inteiro e o nome a partir de cada palavra, para "horizon" achar
+"Forza Horizon 5". O estoque fica num dict ao lado. O banco só é lido uma vez
+na subida; depois quem grava contas avisa o índice com `somar`.
+"""
+import heapq
+from bisect import bisect_left, insort
+
+from classificador import normalizar
+
+# Teto de chaves olhadas por consulta, para prefixos de 1 letra não varrerem tudo
+MAX_VARRIDOS = 500
+
+
+def _chaves(nome):
+    palavras = normalizar(nome).split()
+    return [(" ".join(palavras[i:]), i, nome) for i in range(len(palavras))]
+
+
+class IndiceJogos:
+    def __init__(self):
+        self._chaves = {}   # guild_id -> [(chave, posição da palavra, nome)] ordenada
+        self._estoque = {}  # guild_id -> {nome: disponíveis}
+
+    def carregar(self, linhas):
+        """Troca o índice inteiro por (guild_id, nome, disponiveis) vindos do banco."""
+        chaves, estoque = {}, {}
+        for guild_id, nome, disponiveis in linhas:
+            if disponiveis > 0:
+                estoque.setdefault(guild_id, {})[nome] = disponiveis
+                chaves.setdefault(guild_id, []).extend(_chaves(nome))
+        for lista in chaves.values():
+            lista.sort()
+        self._chaves, self._estoque = chaves, estoque
+
+    def somar(self, guild_id, nome, delta):
+        """Ajusta o estoque de um jogo; entra no índice ao ganhar estoque e sai ao zerar."""
+        estoque = self._estoque.setdefault(guild_id, {})
+        antes = estoque.get(nome, 0)
+        depois = max(0, antes + delta)
+        if depois:
+            estoque[nome] = depois
+        else:
+            estoque.pop(nome, None)
+
+        chaves = self._chaves.setdefault(guild_id, [])
+        if not antes and depois:
+            for chave in _chaves(nome):
+                insort(chaves, chave)
+        elif antes and not depois:
+            for chave in _chaves(nome):
+                i = bisect_left(chaves, chave)
+                if i < len(chaves) and chaves[i] == chave:
+                    del chaves[i]
+
+    def disponiveis(self, guild_id, nome):
+        return self._estoque.get(guild_id, {}).get(nome, 0)
+
+    def sugerir(self, guild_id, termo, limite=25):
+        """[(nome, disponíveis)]: nomes que começam com o termo primeiro, depois palavras internas."""
+        estoque = self._estoque.get(guild_id)
+        if not estoque:
+            return []
+        termo = normalizar(termo)
+        if not termo:
+            return heapq.nlargest(limite, estoque.items(), key=lambda item: item[1])
+
+        chaves = self._chaves[guild_id]
+        melhores = {}
+        i = bisect_left(chaves, (termo,))
+        fim = min(len(chaves), i + MAX_VARRIDOS)
+        while i < fim and chaves[i][0].startswith(termo):
+            _, posicao, nome = chaves[i]
+            if nome not in melhores or posicao < melhores[nome]:
+                melhores[nome] = posicao
+            i += 1
+        ordenados = sorted(melhores, key=lambda nome: (melhores[nome] > 0, -estoque[nome], nome))
+        return [(nome, estoque[nome]) for nome in ordenados[:limite]]
+
+    def __len__(self):
+        return sum(len(estoque) for estoque in self._estoque.values())
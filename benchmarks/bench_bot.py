@@ -0,0 +1,311 @@
+"""Benchmark offline do bot: roda os handlers reais contra bancos sintéticos.
+
+Uso:
+    python benchmarks/bench_bot.py                       # 1k, 100k e 1M contas
+    python benchmarks/bench_bot.py --tamanhos 1000 --saida base.json
+    python benchmarks/bench_bot.py --comparar base.json  # sai com 1 se regredir
+
+O cenário "disputa" dispara 2000 buscas simultâneas por um jogo com 50 contas e
+sai com 1 se alguma conta for entregue duas vezes ou se sobrar estoque.
+
+Não precisa de token: Interaction/Attachment são falsos (benchmarks/fakes.py)
+e cada tamanho usa um banco novo num diretório temporário. Antes dos cenários,
+confere as migrações de bancos antigos (benchmarks/migracao.py) e sai com 1 se falharem.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bot  # noqa: E402
+import migracao  # noqa: E402
+from fakes import AnexoFake, CargoFake, GuildFake, InteracaoFake, MembroFake, preencher  # noqa: E402
+from parser_contas import medir_throughput  # noqa: E402
+
+PALAVRAS = [
+    "Forza", "Horizon", "Assassin's", "Creed", "Elden", "Ring", "Resident", "Evil", "Call", "Duty",
+    "Cities", "Skylines", "Dragon", "Souls", "Truck", "Simulator", "Lego", "Batman", "Dead", "Space",
+    "Final", "Fantasy", "Red", "Dead", "Redemption", "Need", "Speed", "Witcher", "Battlefield", "Grid",
+]
+
+
+def nome_jogo(i):
+    rng = random.Random(i)
+    return f"{rng.choice(PALAVRAS)} {rng.choice(PALAVRAS)} {i}"
+
+
+def gerar_dump(quantidade, inicio=0):
+    """Arquivo no formato do /importar, misturando os três formatos aceitos."""
+    partes = []
+    for i in range(inicio, inicio + quantidade):
+        jogo = nome_jogo(i % 5000)
+        partes.append(f"==================== CONTA {i}\n")
+        formato = i % 3
+        if formato == 0:
+            partes.append(f"🎮 Jogo: {jogo}\nLogin: user{i} Senha: senha{i}x\n\n")
+        elif formato == 1:
+            partes.append(f"Jogo: {jogo}\nUsuário: user{i}\nSenha: senha{i}x\n\n")
+        else:
+            partes.append(f"Games: {jogo}\nUser: user{i} / Pass: senha{i}x\n\n")
+    return "".join(partes).encode("utf-8")
+
+
+def percentil(ordenadas, q):
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+
+
+async def medir(cenario, tamanho, ops, operacao, concorrencia):
+    latencias = []
+    falhas = 0
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def uma(i):
+        nonlocal falhas
+        async with semaforo:
+            inicio = time.perf_counter()
+            ok = await operacao(i)
+            latencias.append(time.perf_counter() - inicio)
+            falhas += not ok
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(uma(i) for i in range(ops)))
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    resultado = {
+        "cenario": cenario,
+        "tamanho": tamanho,
+        "ops": ops,
+        "ops_s": ops / total,
+        "p50_ms": percentil(latencias, 0.50) * 1000,
+        "p95_ms": percentil(latencias, 0.95) * 1000,
+        "p99_ms": percentil(latencias, 0.99) * 1000,
+        "falhas": falhas,
+    }
+    print(
+        f"{cenario:<20} {tamanho:>9} {ops:>6} {resultado['ops_s']:>10.1f} "
+        f"{resultado['p50_ms']:>8.2f} {resultado['p95_ms']:>8.2f} {resultado['p99_ms']:>8.2f} {falhas:>6}"
+    )
+    return resultado
+
+
+def sem_erro(interacao):
+    conteudo = next((c for c, _ in interacao.mensagens if c), "")
+    return not conteudo.startswith(("❌", "⚠️", "⏳", "🚦"))
+
+
+def login_entregue(interacao):
+    """Login da conta que o handler mandou no embed, ou None."""
+    for _, kwargs in interacao.mensagens:
+        embed = kwargs.get("embed")
+        for campo in embed.fields if embed else ():
+            if campo.name == "👤 Login":
+                return campo.value.strip("`")
+    return None
+
+
+def conferir_entregas(resultado, entregues, esperadas=None):
+    """Marca o resultado com erro se alguma conta saiu duas vezes (ou faltou entregar)."""
+    repetidas = len(entregues) - len(set(entregues))
+    if repetidas:
+        resultado["erro"] = f"{repetidas} contas entregues mais de uma vez"
+    elif esperadas is not None and len(entregues) != esperadas:
+        resultado["erro"] = f"{len(entregues)} contas entregues, estoque era {esperadas}"
+    if "erro" in resultado:
+        print(f"❌ {resultado['cenario']}: {resultado['erro']}")
+    return resultado
+
+
+async def popular(db, guild_id, tamanho, lote=10_000):
+    jogos = max(20, tamanho // 50)
+    feitas = 0
+    while feitas < tamanho:
+        n = min(lote, tamanho - feitas)
+        await db.add_contas_bulk(
+            guild_id,
+            ((nome_jogo(i % jogos), "Geral", f"login{i}", f"senha{i}") for i in range(feitas, feitas + n)),
+            tamanho_lote=lote
+        )
+        feitas += n
+    return jogos
+
+
+async def rodar_tamanho(tamanho, concorrencia, concorrencia_escrita, diretorio):
+    db = bot.Database(os.path.join(diretorio, f"bench_{tamanho}.db"))
+    bot.db = db
+    bot.importacoes.db = db
+    await db.init()
+
+    cargo_vip = CargoFake(bot.CARGO_VIP)
+    guild = GuildFake([cargo_vip])
+
+    inicio = time.perf_counter()
+    jogos = await popular(db, guild.id, tamanho)
+    print(f"-- {tamanho} contas / {jogos} jogos criados em {time.perf_counter() - inicio:.1f}s")
+
+    admin = MembroFake(guild, user_id=bot.ADMIN_ID)
+    resultados = []
+
+    async def estatisticas(i):
+        return bool(await db.get_estatisticas(guild.id))
+
+    entregues = []
+
+    async def buscar(i):
+        interacao = InteracaoFake(MembroFake(guild, cargos=[cargo_vip]), guild)
+        nome = nome_jogo(random.randrange(jogos)).split(" ", 1)[1]
+        await preencher(bot.BuscarJogoModal(), nome=nome).on_submit(interacao)
+        login = login_entregue(interacao)
+        if login:
+            entregues.append(login)
+        return sem_erro(interacao)
+
+    # Disputa: muito mais pedidos simultâneos que estoque de um jogo só
+    estoque_disputa = 50
+    await db.add_contas_bulk(
+        guild.id, [("Disputa Bench", "Geral", f"disputa{i}", "senha") for i in range(estoque_disputa)]
+    )
+    disputadas = []
+
+    async def disputar(i):
+        interacao = InteracaoFake(MembroFake(guild, cargos=[cargo_vip]), guild)
+        await preencher(bot.BuscarJogoModal(), nome="Disputa Bench").on_submit(interacao)
+        login = login_entregue(interacao)
+        if login and login.startswith("disputa"):
+            disputadas.append(login)
+        return True
+
+    async def autocompletar(i):
+        interacao = InteracaoFake(MembroFake(guild, cargos=[cargo_vip]), guild)
+        nome = nome_jogo(random.randrange(jogos))
+        return bool(await bot.buscar_autocomplete(interacao, nome[:1 + i % 8]))
+
+    ops_keys = min(2000, max(100, tamanho // 100))
+    keys = await db.criar_keys(guild.id, ops_keys, "7d", bot.CARGO_VIP, bot.ADMIN_ID)
+
+    async def resgatar(i):
+        interacao = InteracaoFake(MembroFake(guild), guild)
+        await preencher(bot.ResgatarKeyModal(), key=keys[i]).on_submit(interacao)
+        return sem_erro(interacao)
+
+    async def lista(i):
+        interacao = InteracaoFake(admin, guild)
+        await bot.lista.callback(interacao)
+        return sem_erro(interacao)
+
+    dumps = [gerar_dump(2000, inicio=tamanho + i * 2000) for i in range(5)]
+
+    async def importar(i):
+        # Mede do comando até o job terminar de gravar
+        interacao = InteracaoFake(admin, guild)
+        await bot.importar.callback(interacao, AnexoFake(dumps[i]))
+        await bot.importacoes.aguardar()
+        return sem_erro(interacao)
+
+    async def gerar_keys(i):
+        # Do comando até o arquivo com as 10k keys sair no followup
+        interacao = InteracaoFake(admin, guild)
+        await bot.gerar_keys.callback(interacao, 10_000, "7d", bot.CARGO_VIP)
+        return sem_erro(interacao) and interacao.followup.enviadas[0][0].startswith("🔑 **10000 keys")
+
+    async def escritas(i):
+        # Mistura das escritas pequenas que as interações disparam
+        if i % 2:
+            await db.set_config(f"bench_{i % 50}", str(i), guild.id)
+        else:
+            await db.marcar_conta_usada(guild.id, i % tamanho + 1, i)
+        return True
+
+    resultados.append(await medir("get_estatisticas", tamanho, 500, estatisticas, concorrencia))
+    resultados.append(await medir("autocomplete", tamanho, 2000, autocompletar, concorrencia))
+    resultados.append(conferir_entregas(
+        await medir("BuscarJogoModal", tamanho, min(1000, tamanho // 2), buscar, concorrencia), entregues
+    ))
+    resultados.append(conferir_entregas(
+        await medir("disputa", tamanho, 2000, disputar, 2000), disputadas, estoque_disputa
+    ))
+    resultados.append(await medir("ResgatarKeyModal", tamanho, ops_keys, resgatar, concorrencia))
+    resultados.append(await medir("lista", tamanho, 200, lista, concorrencia))
+    resultados.append(await medir("escritas", tamanho, 5000, escritas, concorrencia_escrita))
+    resultados.append(await medir("importar(2k)", tamanho, len(dumps), importar, 1))
+    resultados.append(await medir("gerar_keys(10k)", tamanho, 5, gerar_keys, 1))
+
+    await db.close()
+    return resultados
+
+
+def rodar_parser(megabytes):
+    resultados = []
+    for mb in megabytes:
+        # ~90 bytes por conta
+        dados = gerar_dump(int(mb * 1024 * 1024 / 90))
+        mb_s = medir_throughput(dados)
+        print(f"{'parser':<20} {f'{mb}MB':>9} {'':>6} {mb_s:>10.1f} MB/s")
+        resultados.append({"cenario": "parser", "tamanho": mb, "ops_s": mb_s})
+    return resultados
+
+
+def comparar(resultados, caminho, tolerancia):
+    with open(caminho) as f:
+        base = {(r["cenario"], r["tamanho"]): r for r in json.load(f)}
+    regressoes = []
+    for r in resultados:
+        antes = base.get((r["cenario"], r["tamanho"]))
+        if antes and r["ops_s"] < antes["ops_s"] * (1 - tolerancia):
+            regressoes.append(f"{r['cenario']} ({r['tamanho']}): {antes['ops_s']:.1f} -> {r['ops_s']:.1f} ops/s")
+    for linha in regressoes:
+        print(f"❌ Regressão: {linha}")
+    return not regressoes
+
+
+async def principal(args):
+    with tempfile.TemporaryDirectory() as diretorio:
+        if not await migracao.verificar(diretorio):
+            sys.exit(1)
+
+    # O benchmark mede os handlers, não o rate limit nem as edições de mensagem no Discord
+    bot.limitador.regras = {}
+    bot.limitador.padrao = (float("inf"), float("inf"))
+
+    async def sem_aviso(job, contas=None):
+        pass
+    bot.importacoes.avisar = sem_aviso
+    bot.importacoes.iniciar()
+
+    print(f"{'cenario':<20} {'tamanho':>9} {'ops':>6} {'ops/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'falhas':>6}")
+    resultados = rodar_parser(args.parser_mb)
+    with tempfile.TemporaryDirectory() as diretorio:
+        for tamanho in args.tamanhos:
+            resultados += await rodar_tamanho(tamanho, args.concorrencia, args.concorrencia_escrita, diretorio)
+    await bot.importacoes.parar()
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline do NyuxStore bot")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--parser-mb", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--concorrencia-escrita", type=int, default=64)
+    parser.add_argument("--saida", help="Salva os resultados em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Queda aceitável de ops/s (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    resultados = asyncio.run(principal(args))
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resultados, f, indent=2)
+    if any("erro" in r for r in resultados):
+        sys.exit(1)
+    if args.comparar and not comparar(resultados, args.comparar, args.tolerancia):
+        sys.exit(1)
@@ -0,0 +1,119 @@
+"""Objetos falsos de Interaction/Attachment para rodar os handlers sem Discord."""
+import itertools
+
+_ids = itertools.count(10_000)
+
+
+class CargoFake:
+    def __init__(self, nome, role_id=None):
+        self.id = role_id or next(_ids)
+        self.name = nome
+        self.mention = f"<@&{self.id}>"
+
+
+class GuildFake:
+    def __init__(self, cargos=(), guild_id=None, filesize_limit=10 * 1024 * 1024, owner_id=None):
+        self.id = guild_id or next(_ids)
+        self.owner_id = owner_id
+        self.roles = list(cargos)
+        self.filesize_limit = filesize_limit
+
+    def get_role(self, role_id):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+
+class MembroFake:
+    def __init__(self, guild, user_id=None, cargos=()):
+        self.id = user_id or next(_ids)
+        self.guild = guild
+        self.roles = list(cargos)
+        self.mention = f"<@{self.id}>"
+        self.display_name = f"membro{self.id}"
+
+    def get_role(self, role_id):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    async def add_roles(self, *cargos, reason=None):
+        self.roles.extend(cargos)
+
+    async def remove_roles(self, *cargos, reason=None):
+        self.roles = [r for r in self.roles if r not in cargos]
+
+
+class RespostaFake:
+    def __init__(self):
+        self.enviadas = []
+        self._feito = False
+
+    def is_done(self):
+        return self._feito
+
+    async def send_message(self, content=None, **kwargs):
+        self.enviadas.append((content, kwargs))
+        self._feito = True
+
+    async def defer(self, **kwargs):
+        self._feito = True
+
+    async def send_modal(self, modal):
+        self.enviadas.append((None, {"modal": modal}))
+        self._feito = True
+
+    async def edit_message(self, **kwargs):
+        self.enviadas.append((None, kwargs))
+        self._feito = True
+
+
+class FollowupFake:
+    def __init__(self):
+        self.enviadas = []
+
+    async def send(self, content=None, **kwargs):
+        self.enviadas.append((content, kwargs))
+
+
+class MensagemFake:
+    def __init__(self, canal):
+        self.id = next(_ids)
+        self.jump_url = f"https://discord.com/channels/0/{canal.id}/{self.id}"
+
+
+class CanalFake:
+    def __init__(self):
+        self.id = next(_ids)
+
+    async def send(self, content=None, **kwargs):
+        return MensagemFake(self)
+
+
+class InteracaoFake:
+    def __init__(self, user, guild=None, custom_id=None):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.channel = CanalFake()
+        self.channel_id = self.channel.id
+        self.response = RespostaFake()
+        self.followup = FollowupFake()
+        self.data = {"custom_id": custom_id} if custom_id else {}
+
+    @property
+    def mensagens(self):
+        return self.response.enviadas + self.followup.enviadas
+
+
+class AnexoFake:
+    def __init__(self, dados, filename="contas.txt"):
+        self.dados = dados
+        self.filename = filename
+        self.size = len(dados)
+
+    async def read(self):
+        return self.dados
+
+
+def preencher(modal, **valores):
+    """Preenche os TextInput de um Modal como se o usuário tivesse digitado."""
+    for campo, valor in valores.items():
+        getattr(modal, campo)._value = valor
+    return modal
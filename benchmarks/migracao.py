@@ -0,0 +1,173 @@
+"""Confere as migrações de banco: esquema original (baseline) e versão 2 → atual.
+
+Uso:
+    python benchmarks/migracao.py        # sai com 1 se alguma migração falhar
+
+Também roda no começo do bench_bot.py. Cada caso monta um banco antigo com
+algumas contas/keys, abre com o `Database` atual e confere se nada se perdeu.
+Sem GUILD_PRINCIPAL_ID, o banco antigo com estoque tem que ser recusado intacto.
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import bot  # noqa: E402
+
+# Esquema do bot antes do pool de conexões (o nyux_store.db de produção)
+ESQUEMA_BASELINE = """
+CREATE TABLE contas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jogo TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    login TEXT NOT NULL,
+    senha TEXT NOT NULL,
+    adicionado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    usado_por INTEGER DEFAULT NULL,
+    usado_em TIMESTAMP DEFAULT NULL,
+    status TEXT DEFAULT 'disponivel'
+);
+CREATE TABLE keys (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key_code TEXT UNIQUE NOT NULL,
+    duracao TEXT NOT NULL,
+    cargo TEXT NOT NULL,
+    criado_por INTEGER NOT NULL,
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    usado_por INTEGER DEFAULT NULL,
+    usado_em TIMESTAMP DEFAULT NULL,
+    ativa INTEGER DEFAULT 1
+);
+CREATE TABLE config (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+INSERT INTO contas (jogo, categoria, login, senha) VALUES
+    ('Elden Ring', 'Rpg', 'user1', 'senha1'),
+    ('Elden Ring', 'Rpg', 'USER1', 'senha1'),
+    ('Forza Horizon 5', 'Corrida', 'user2', 'senha2');
+INSERT INTO contas (jogo, categoria, login, senha, usado_por, usado_em, status) VALUES
+    ('Forza Horizon 5', 'Corrida', 'user3', 'senha3', 42, '2020-01-01 00:00:00', 'usada');
+INSERT INTO keys (key_code, duracao, cargo, criado_por) VALUES ('NYUX-STORE-AAAAAAAAAA', '7d', 'Vip Pack', 1);
+INSERT INTO config (chave, valor) VALUES ('categoria_padrao', 'Outros');
+"""
+
+
+def versao_2(caminho):
+    """Rebaixa um banco atual para a versão 2 (arquivo já existe, sem hash)."""
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        DROP INDEX idx_contas_hash;
+        DROP INDEX idx_contas_arquivo_hash;
+        DROP VIEW contas_todas;
+        ALTER TABLE contas DROP COLUMN hash;
+        ALTER TABLE contas_arquivo DROP COLUMN hash;
+        PRAGMA user_version = 2;
+    """)
+    conn.close()
+
+
+async def conferir(caminho, falhas, caso):
+    db = bot.Database(caminho)
+    try:
+        await db.init()
+    except Exception as e:
+        falhas.append(f"{caso}: init falhou ({e!r})")
+        return
+    try:
+        async with db.pool.leitura() as conn:
+            cursor = await conn.execute("PRAGMA user_version")
+            if (await cursor.fetchone())[0] != bot.SCHEMA_VERSAO:
+                falhas.append(f"{caso}: user_version não foi atualizado")
+            cursor = await conn.execute("SELECT COUNT(*), COUNT(hash) FROM contas_todas")
+            total, com_hash = await cursor.fetchone()
+            # A segunda conta repete a primeira (login sem caixa) e fica sem hash
+            if (total, com_hash) != (4, 3):
+                falhas.append(f"{caso}: esperava 4 contas / 3 com hash, veio {total} / {com_hash}")
+        stats = await db.get_estatisticas(bot.GUILD_PRINCIPAL_ID)
+        if stats['disponiveis'] != 3:
+            falhas.append(f"{caso}: contadores errados {stats}")
+        if await db.get_config('categoria_padrao') != 'Outros':
+            falhas.append(f"{caso}: config perdida")
+        if await db.add_conta(bot.GUILD_PRINCIPAL_ID, 'Elden Ring', 'Rpg', 'user1', 'senha1'):
+            falhas.append(f"{caso}: conta repetida foi aceita depois da migração")
+    finally:
+        await db.close()
+
+    # Abrir de novo não pode tentar migrar outra vez
+    db = bot.Database(caminho)
+    try:
+        await db.init()
+    except Exception as e:
+        falhas.append(f"{caso}: segundo init falhou ({e!r})")
+        return
+    await db.close()
+
+
+async def sem_guild_principal(caminho, falhas):
+    """Sem GUILD_PRINCIPAL_ID o init recusa o banco com estoque e não mexe nele."""
+    db = bot.Database(caminho)
+    try:
+        await db.init()
+    except RuntimeError:
+        pass
+    else:
+        await db.close()
+        falhas.append("sem GUILD_PRINCIPAL_ID: o banco com estoque foi migrado para a guild 0")
+        return
+    conn = sqlite3.connect(caminho)
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    colunas = {row[1] for row in conn.execute("PRAGMA table_info(contas)")}
+    conn.close()
+    if versao != 0 or 'guild_id' in colunas:
+        falhas.append("sem GUILD_PRINCIPAL_ID: o banco ficou meio migrado")
+
+
+async def verificar(diretorio):
+    falhas = []
+    guild_principal = bot.GUILD_PRINCIPAL_ID
+
+    bot.GUILD_PRINCIPAL_ID = 0
+    recusado = os.path.join(diretorio, "sem_guild.db")
+    conn = sqlite3.connect(recusado)
+    conn.executescript(ESQUEMA_BASELINE)
+    conn.close()
+    await sem_guild_principal(recusado, falhas)
+
+    # Os outros casos migram para um servidor de verdade
+    bot.GUILD_PRINCIPAL_ID = guild_principal or 111
+
+    baseline = os.path.join(diretorio, "baseline.db")
+    conn = sqlite3.connect(baseline)
+    conn.executescript(ESQUEMA_BASELINE)
+    conn.close()
+    await conferir(baseline, falhas, "baseline")
+
+    # Versão 2: um baseline migrado, com a conta usada já no arquivo, sem a coluna hash
+    v2 = os.path.join(diretorio, "v2.db")
+    conn = sqlite3.connect(v2)
+    conn.executescript(ESQUEMA_BASELINE)
+    conn.close()
+    db = bot.Database(v2)
+    await db.init()
+    await db.arquivar_contas('2021-01-01')
+    await db.close()
+    versao_2(v2)
+    await conferir(v2, falhas, "versão 2")
+    bot.GUILD_PRINCIPAL_ID = guild_principal
+
+    for falha in falhas:
+        print(f"❌ Migração: {falha}")
+    if not falhas:
+        print("✅ Migrações baseline e versão 2 → atual ok (e recusa sem GUILD_PRINCIPAL_ID)")
+    return not falhas
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as diretorio:
+        ok = asyncio.run(verificar(diretorio))
+    sys.exit(0 if ok else 1)
@@ -3,38 +3,218 @@ from discord import app_commands
 from discord.ui import View, Button, Modal, TextInput, Select
 import aiosqlite
 import os
-import random
+import secrets
+import json
+import io
+import csv
 import string
 import asyncio
-import re
+import difflib
+import hashlib
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
+from typing import Literal
 import pytz
 
+from conexoes import PoolConexoes
+from classificador import Classificador, REGRAS_PADRAO, CATEGORIA_PADRAO
+from expiracao import AgendadorExpiracao, duracao_em_segundos
+from manutencao import AgendadorManutencao
+from limitador import Limitador
+from metricas import Metricas
+from exportacao import ExportadorArquivos
+from autocompletar import IndiceJogos
+from importacao import ExecutorImportacoes
+
 # Pega das variáveis de ambiente da Railway
 TOKEN = os.environ.get('DISCORD_TOKEN')
 ADMIN_ID_STR = os.environ.get('ADMIN_ID', '1134304730835861504')
 
-# Verifica se o token existe
-if not TOKEN:
-    print("❌ ERRO: DISCORD_TOKEN não encontrado!")
-    print("Verifique se a variável está configurada na Railway.")
-    exit(1)
-
 ADMIN_ID = int(ADMIN_ID_STR)
 
-print(f"✅ Token carregado: {TOKEN[:20]}...")
-print(f"✅ Admin ID: {ADMIN_ID}")
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9100'))
+
+# Em desenvolvimento: sincroniza os comandos só nesse servidor (aparecem na hora)
+SYNC_GUILD_ID = int(os.environ['SYNC_GUILD_ID']) if os.environ.get('SYNC_GUILD_ID') else None
+FORCAR_SYNC = os.environ.get('FORCAR_SYNC') == '1'
+
+# Arquivamento: contas usadas/keys resgatadas há mais de N dias vão para as tabelas
+# de arquivo, na janela de pouco movimento (horas "inicio-fim" no fuso da loja)
+ARQUIVAR_APOS_DIAS = int(os.environ.get('ARQUIVAR_APOS_DIAS', '30'))
+FUSO = pytz.timezone(os.environ.get('FUSO', 'America/Sao_Paulo'))
+JANELA_MANUTENCAO = tuple(int(h) for h in os.environ.get('JANELA_MANUTENCAO', '3-5').split('-'))
+
+# Servidor que fica com o estoque de bancos criados antes do suporte a vários servidores
+# (obrigatório para migrar um banco antigo que já tem contas ou keys)
+GUILD_PRINCIPAL_ID = int(os.environ.get('GUILD_PRINCIPAL_ID', '0'))
+
+# AUTO_SHARD=1 usa AutoShardedClient; SHARD_COUNT fixa o número de shards (senão o Discord decide)
+AUTO_SHARD = os.environ.get('AUTO_SHARD') == '1'
+SHARD_COUNT = int(os.environ['SHARD_COUNT']) if os.environ.get('SHARD_COUNT') else None
+
+INICIO_PROCESSO = time.monotonic()
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
+# Mantêm a tabela `jogos` (nomes distintos + estoque) e o índice FTS em dia com `contas`
+TRIGGERS_BUSCA = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS contas_busca_ai AFTER INSERT ON contas BEGIN
+        INSERT INTO jogos (guild_id, nome, disponiveis) VALUES (new.guild_id, new.jogo, new.status = 'disponivel')
+        ON CONFLICT (guild_id, nome) DO UPDATE SET disponiveis = disponiveis + (new.status = 'disponivel');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS contas_busca_ad AFTER DELETE ON contas BEGIN
+        UPDATE jogos SET disponiveis = disponiveis - (old.status = 'disponivel')
+        WHERE guild_id = old.guild_id AND nome = old.jogo;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS contas_busca_au AFTER UPDATE OF guild_id, jogo, status ON contas BEGIN
+        UPDATE jogos SET disponiveis = disponiveis - (old.status = 'disponivel')
+        WHERE guild_id = old.guild_id AND nome = old.jogo;
+        INSERT INTO jogos (guild_id, nome, disponiveis) VALUES (new.guild_id, new.jogo, new.status = 'disponivel')
+        ON CONFLICT (guild_id, nome) DO UPDATE SET disponiveis = disponiveis + (new.status = 'disponivel');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS jogos_fts_ai AFTER INSERT ON jogos BEGIN
+        INSERT INTO jogos_fts (rowid, nome) VALUES (new.id, new.nome);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS jogos_fts_ad AFTER DELETE ON jogos BEGIN
+        INSERT INTO jogos_fts (jogos_fts, rowid, nome) VALUES ('delete', old.id, old.nome);
+    END
+    ''',
+)
+
+# Contadores de inventário por servidor: totais por status no geral, por categoria
+# e por jogo, além das keys. Os triggers abaixo mantêm tudo em dia a cada escrita.
+UPSERT_CONTADOR = (
+    "INSERT INTO contadores (guild_id, escopo, categoria, jogo, status, total) VALUES ({}, {}, {}, {}, {}, {}) "
+    "ON CONFLICT (guild_id, escopo, categoria, jogo, status) DO UPDATE SET total = total + excluded.total;"
+)
+
+def _contar_conta(ref, delta):
+    guild = f"{ref}.guild_id"
+    status = f"coalesce({ref}.status, '')"
+    return "\n".join((
+        UPSERT_CONTADOR.format(guild, "'contas'", "''", "''", status, delta),
+        UPSERT_CONTADOR.format(guild, "'categoria'", f"{ref}.categoria", "''", status, delta),
+        UPSERT_CONTADOR.format(guild, "'jogo'", f"{ref}.categoria", f"{ref}.jogo", status, delta),
+    ))
+
+def _contar_key(ref, delta):
+    status = f"CASE WHEN {ref}.usado_por IS NULL THEN 'ativa' ELSE 'usada' END"
+    return UPSERT_CONTADOR.format(f"{ref}.guild_id", "'keys'", "''", "''", status, delta)
+
+TRIGGERS_CONTADORES = (
+    f"CREATE TRIGGER IF NOT EXISTS contas_contadores_ai AFTER INSERT ON contas BEGIN {_contar_conta('new', 1)} END",
+    f"CREATE TRIGGER IF NOT EXISTS contas_contadores_ad AFTER DELETE ON contas BEGIN {_contar_conta('old', -1)} END",
+    f"""CREATE TRIGGER IF NOT EXISTS contas_contadores_au AFTER UPDATE OF guild_id, status, categoria, jogo ON contas BEGIN
+        {_contar_conta('old', -1)}
+        {_contar_conta('new', 1)}
+    END""",
+    f"CREATE TRIGGER IF NOT EXISTS keys_contadores_ai AFTER INSERT ON keys BEGIN {_contar_key('new', 1)} END",
+    f"CREATE TRIGGER IF NOT EXISTS keys_contadores_ad AFTER DELETE ON keys BEGIN {_contar_key('old', -1)} END",
+    f"""CREATE TRIGGER IF NOT EXISTS keys_contadores_au AFTER UPDATE OF guild_id, usado_por ON keys BEGIN
+        {_contar_key('old', -1)}
+        {_contar_key('new', 1)}
+    END""",
+    # O arquivo também conta: mover uma linha para lá tira do quente e soma aqui
+    f"CREATE TRIGGER IF NOT EXISTS contas_arquivo_contadores_ai AFTER INSERT ON contas_arquivo BEGIN {_contar_conta('new', 1)} END",
+    f"CREATE TRIGGER IF NOT EXISTS contas_arquivo_contadores_ad AFTER DELETE ON contas_arquivo BEGIN {_contar_conta('old', -1)} END",
+    f"CREATE TRIGGER IF NOT EXISTS keys_arquivo_contadores_ai AFTER INSERT ON keys_arquivo BEGIN {_contar_key('new', 1)} END",
+    f"CREATE TRIGGER IF NOT EXISTS keys_arquivo_contadores_ad AFTER DELETE ON keys_arquivo BEGIN {_contar_key('old', -1)} END",
+)
+
+# Colunas copiadas para as tabelas de arquivo (contas_arquivo/keys_arquivo)
+COLUNAS_CONTAS = "id, jogo, categoria, login, senha, adicionado_em, usado_por, usado_em, status, guild_id, hash"
+COLUNAS_KEYS = "id, key_code, duracao, cargo, criado_por, criado_em, usado_por, usado_em, ativa, guild_id"
+
+ALFABETO_KEY = string.ascii_uppercase + string.digits
+
+def gerar_codigo_key():
+    return "NYUX-STORE-" + "".join(secrets.choice(ALFABETO_KEY) for _ in range(10))
+
+def hash_conta(login, senha):
+    """Digest de login+senha que identifica a conta entre importações (login sem caixa).
+
+    64 bits cabem num INTEGER do SQLite (índice pequeno); com 1M de contas num
+    servidor a chance de uma colisão descartar uma conta nova é ~1 em 30 milhões.
+    """
+    dados = f"{login.strip().lower()}\0{senha.strip()}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(dados, digest_size=8).digest(), "big", signed=True)
+
+def normalizar_termo(termo):
+    return " ".join(termo.split())
+
+def frase_fts(texto):
+    # Aspas transformam o termo numa frase FTS5 (busca por substring no trigram)
+    return '"' + texto.replace('"', '""') + '"'
+
+metricas = Metricas()
+
+def medir(tipo, nome):
+    return metricas.medir("latencia_segundos", tipo=tipo, nome=nome)
+
+class CacheTTL:
+    """Cache pequeno em memória, com validade curta e tamanho máximo."""
+    
+    def __init__(self, ttl=30, maximo=128):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._itens = OrderedDict()
+    
+    def get(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        valor, expira = item
+        if expira < time.monotonic():
+            del self._itens[chave]
+            return None
+        self._itens.move_to_end(chave)
+        return valor
+    
+    def set(self, chave, valor):
+        self._itens[chave] = (valor, time.monotonic() + self.ttl)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.maximo:
+            self._itens.popitem(last=False)
+
+# PRAGMA user_version: 1 = tabelas com guild_id, 2 = tabelas de arquivo, 3 = hash das contas
+SCHEMA_VERSAO = 3
+
 class Database:
-    def __init__(self):
-        self.db_path = "nyux_store.db"
+    def __init__(self, db_path="nyux_store.db"):
+        self.db_path = db_path
+        self.pool = PoolConexoes(self.db_path)
+        self._cache_paginas = CacheTTL(ttl=30)
+        # Jogos com estoque em memória (autocomplete); as escritas abaixo o mantêm em dia
+        self.estoque = IndiceJogos()
     
     async def init(self):
-        async with aiosqlite.connect(self.db_path) as db:
+        await self.pool.abrir()
+        try:
+            await self._criar_schema()
+        except BaseException:
+            # Sem fechar, as threads do aiosqlite seguram o processo vivo depois do erro
+            await self.pool.fechar()
+            raise
+
+    async def _criar_schema(self):
+        async with self.pool.escrita() as db:
+            cursor = await db.execute("PRAGMA user_version")
+            if (await cursor.fetchone())[0] < 1:
+                await self._migrar_para_guilds(db)
+            
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS contas (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -45,7 +225,9 @@ class Database:
                     adicionado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     usado_por INTEGER DEFAULT NULL,
                     usado_em TIMESTAMP DEFAULT NULL,
-                    status TEXT DEFAULT 'disponivel'
+                    status TEXT DEFAULT 'disponivel',
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    hash INTEGER
                 )
             ''')
             
@@ -59,125 +241,1082 @@ class Database:
                     criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     usado_por INTEGER DEFAULT NULL,
                     usado_em TIMESTAMP DEFAULT NULL,
-                    ativa INTEGER DEFAULT 1
+                    ativa INTEGER DEFAULT 1,
+                    guild_id INTEGER NOT NULL DEFAULT 0
                 )
             ''')
             
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS config (
-                    chave TEXT PRIMARY KEY,
-                    valor TEXT
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    chave TEXT NOT NULL,
+                    valor TEXT,
+                    PRIMARY KEY (guild_id, chave)
                 )
             ''')
-            await db.commit()
-    
-    async def add_conta(self, jogo, categoria, login, senha):
-        async with aiosqlite.connect(self.db_path) as db:
+
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_contas_guild_status_jogo ON contas (guild_id, status, jogo)")
             await db.execute(
-                "INSERT INTO contas (jogo, categoria, login, senha) VALUES (?, ?, ?, ?)",
-                (jogo.strip().title(), categoria.strip().title(), login, senha)
+                "CREATE INDEX IF NOT EXISTS idx_contas_guild_status_categoria ON contas (guild_id, status, categoria)"
             )
-            await db.commit()
-    
-    async def buscar_conta(self, nome_jogo):
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                "SELECT * FROM contas WHERE jogo LIKE ? AND status = 'disponivel' LIMIT 1",
-                (f"%{nome_jogo}%",)
+
+            # Índice de busca: um registro por nome de jogo, com o estoque disponível,
+            # mantido pelos triggers de `contas`. A busca trigram roda sobre os nomes
+            # distintos, então não cresce com o número de contas.
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS jogos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL,
+                    nome TEXT NOT NULL,
+                    disponiveis INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (guild_id, nome)
+                )
+            ''')
+            await db.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS jogos_fts USING fts5(
+                    nome, content='jogos', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+            for trigger in TRIGGERS_BUSCA:
+                await db.execute(trigger)
+
+            # Bancos antigos: popula o índice a partir das contas já existentes
+            cursor = await db.execute("SELECT 1 FROM jogos LIMIT 1")
+            if not await cursor.fetchone():
+                await db.execute('''
+                    INSERT INTO jogos (guild_id, nome, disponiveis)
+                    SELECT guild_id, jogo, SUM(status = 'disponivel') FROM contas GROUP BY guild_id, jogo
+                ''')
+
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS contadores (
+                    guild_id INTEGER NOT NULL,
+                    escopo TEXT NOT NULL,
+                    categoria TEXT NOT NULL,
+                    jogo TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (guild_id, escopo, categoria, jogo, status)
+                ) WITHOUT ROWID
+            ''')
+
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS regras_categoria (
+                    termo TEXT PRIMARY KEY,
+                    categoria TEXT NOT NULL,
+                    prioridade INTEGER NOT NULL DEFAULT 100
+                )
+            ''')
+            cursor = await db.execute("SELECT 1 FROM regras_categoria LIMIT 1")
+            if not await cursor.fetchone():
+                await db.executemany(
+                    "INSERT INTO regras_categoria (termo, categoria, prioridade) VALUES (?, ?, ?)",
+                    REGRAS_PADRAO
+                )
+
+            # Cargos dados por keys; expira_em em segundos Unix, NULL = lifetime
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS assinaturas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    cargo_id INTEGER NOT NULL,
+                    key_id INTEGER,
+                    inicio TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expira_em INTEGER,
+                    ativa INTEGER NOT NULL DEFAULT 1,
+                    UNIQUE (guild_id, user_id, cargo_id)
+                )
+            ''')
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_assinaturas_expira ON assinaturas (expira_em)
+                WHERE ativa = 1 AND expira_em IS NOT NULL
+            ''')
+
+            # Jobs do /importar: `processadas` é o cursor do último bloco gravado (a
+            # retomada continua dele). O arquivo fica numa tabela à parte até o fim,
+            # porque todo UPDATE reescreve a linha inteira, blob junto
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS importacoes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    guild_id INTEGER NOT NULL,
+                    admin_id INTEGER NOT NULL,
+                    canal_id INTEGER,
+                    mensagem_id INTEGER,
+                    arquivo TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pendente',
+                    total INTEGER,
+                    processadas INTEGER NOT NULL DEFAULT 0,
+                    adicionadas INTEGER NOT NULL DEFAULT 0,
+                    duplicadas INTEGER NOT NULL DEFAULT 0,
+                    erros INTEGER NOT NULL DEFAULT 0,
+                    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    terminado_em TIMESTAMP
+                )
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS importacoes_arquivos (
+                    importacao_id INTEGER PRIMARY KEY,
+                    conteudo BLOB NOT NULL
+                )
+            ''')
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_importacoes_abertas ON importacoes (id) "
+                "WHERE status IN ('pendente', 'rodando')"
             )
-            return await cursor.fetchone()
-    
-    async def get_contas_por_categoria(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                "SELECT categoria, jogo, login, senha FROM contas WHERE status = 'disponivel' ORDER BY categoria, jogo"
+
+            # Arquivo frio: contas usadas e keys resgatadas antigas saem das tabelas
+            # quentes para as consultas de estoque não passarem por elas
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS contas_arquivo (
+                    id INTEGER PRIMARY KEY,
+                    jogo TEXT NOT NULL,
+                    categoria TEXT NOT NULL,
+                    login TEXT NOT NULL,
+                    senha TEXT NOT NULL,
+                    adicionado_em TIMESTAMP,
+                    usado_por INTEGER,
+                    usado_em TIMESTAMP,
+                    status TEXT,
+                    guild_id INTEGER NOT NULL,
+                    hash INTEGER,
+                    arquivado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS keys_arquivo (
+                    id INTEGER PRIMARY KEY,
+                    key_code TEXT NOT NULL,
+                    duracao TEXT NOT NULL,
+                    cargo TEXT NOT NULL,
+                    criado_por INTEGER NOT NULL,
+                    criado_em TIMESTAMP,
+                    usado_por INTEGER,
+                    usado_em TIMESTAMP,
+                    ativa INTEGER,
+                    guild_id INTEGER NOT NULL,
+                    arquivado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_contas_arquivo_usuario ON contas_arquivo (guild_id, usado_por)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_keys_arquivo_usuario ON keys_arquivo (guild_id, usado_por)")
+            # Contas repetidas entre importações: o hash é único no estoque quente e
+            # indexado no arquivo, para a checagem de um lote ser só busca em índice
+            await self._migrar_hash(db)
+            await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_contas_hash ON contas (guild_id, hash)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_contas_arquivo_hash ON contas_arquivo (guild_id, hash)")
+            # O job de arquivamento acha os candidatos por estes índices parciais
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_contas_usadas ON contas (usado_em) WHERE status = 'usada'")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_keys_usadas ON keys (usado_em) WHERE usado_por IS NOT NULL")
+            # Visões quente + frio para estatísticas e auditoria
+            await db.execute(f'''
+                CREATE VIEW IF NOT EXISTS contas_todas AS
+                SELECT {COLUNAS_CONTAS}, NULL AS arquivado_em FROM contas
+                UNION ALL
+                SELECT {COLUNAS_CONTAS}, arquivado_em FROM contas_arquivo
+            ''')
+            await db.execute(f'''
+                CREATE VIEW IF NOT EXISTS keys_todas AS
+                SELECT {COLUNAS_KEYS}, NULL AS arquivado_em FROM keys
+                UNION ALL
+                SELECT {COLUNAS_KEYS}, arquivado_em FROM keys_arquivo
+            ''')
+            for trigger in TRIGGERS_CONTADORES:
+                await db.execute(trigger)
+
+            cursor = await db.execute("SELECT 1 FROM contadores LIMIT 1")
+            if not await cursor.fetchone():
+                await db.execute('''
+                    INSERT INTO contadores (guild_id, escopo, categoria, jogo, status, total)
+                    SELECT guild_id, 'contas', '', '', coalesce(status, ''), COUNT(*) FROM contas_todas GROUP BY 1, 3, 4, 5
+                    UNION ALL
+                    SELECT guild_id, 'categoria', categoria, '', coalesce(status, ''), COUNT(*)
+                    FROM contas_todas GROUP BY 1, 3, 4, 5
+                    UNION ALL
+                    SELECT guild_id, 'jogo', categoria, jogo, coalesce(status, ''), COUNT(*)
+                    FROM contas_todas GROUP BY 1, 3, 4, 5
+                    UNION ALL
+                    SELECT guild_id, 'keys', '', '', CASE WHEN usado_por IS NULL THEN 'ativa' ELSE 'usada' END, COUNT(*)
+                    FROM keys_todas GROUP BY 1, 5
+                ''')
+            
+            await db.execute(f"PRAGMA user_version = {SCHEMA_VERSAO}")
+
+        async with self.pool.leitura() as db:
+            cursor = await db.execute("SELECT guild_id, nome, disponiveis FROM jogos WHERE disponiveis > 0")
+            self.estoque.carregar(await cursor.fetchall())
+
+    async def _migrar_para_guilds(self, db):
+        """Bancos de antes do multi-servidor: o estoque vai para GUILD_PRINCIPAL_ID.
+
+        As tabelas derivadas (jogos, FTS, contadores) e os triggers são
+        apagados e recriados pelo resto do `init` já com `guild_id`.
+        """
+        cursor = await db.execute("SELECT name FROM pragma_table_info('contas')")
+        colunas = {row[0] for row in await cursor.fetchall()}
+        if not colunas or 'guild_id' in colunas:
+            return
+
+        if not GUILD_PRINCIPAL_ID:
+            cursor = await db.execute("SELECT EXISTS (SELECT 1 FROM contas) OR EXISTS (SELECT 1 FROM keys)")
+            if (await cursor.fetchone())[0]:
+                # Na guild 0 o estoque e as keys ficariam invisíveis para sempre (a versão
+                # do schema sobe e a migração não roda de novo): melhor não subir
+                raise RuntimeError(
+                    "Banco antigo com contas/keys e GUILD_PRINCIPAL_ID não definido: "
+                    "defina o ID do servidor da loja para migrar o estoque"
+                )
+        for tabela in ('contas', 'keys'):
+            await db.execute(f"ALTER TABLE {tabela} ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+            await db.execute(f"UPDATE {tabela} SET guild_id = ?", (GUILD_PRINCIPAL_ID,))
+
+        # As configs antigas (categoria padrão, hash dos comandos) valem para o bot todo: guild 0
+        await db.execute("ALTER TABLE config RENAME TO config_antiga")
+        await db.execute('''
+            CREATE TABLE config (
+                guild_id INTEGER NOT NULL DEFAULT 0,
+                chave TEXT NOT NULL,
+                valor TEXT,
+                PRIMARY KEY (guild_id, chave)
             )
-            return await cursor.fetchall()
+        ''')
+        await db.execute("INSERT INTO config (guild_id, chave, valor) SELECT 0, chave, valor FROM config_antiga")
+        await db.execute("DROP TABLE config_antiga")
+
+        cursor = await db.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        for (trigger,) in await cursor.fetchall():
+            await db.execute(f"DROP TRIGGER {trigger}")
+        for tabela in ('jogos_fts', 'jogos', 'contadores'):
+            await db.execute(f"DROP TABLE IF EXISTS {tabela}")
+        await db.execute("DROP INDEX IF EXISTS idx_contas_status_jogo")
+        await db.execute("DROP INDEX IF EXISTS idx_contas_status_categoria")
+        print(f"✅ Banco migrado para vários servidores (estoque antigo → guild {GUILD_PRINCIPAL_ID})")
+
+    async def _migrar_hash(self, db):
+        """Preenche o hash das contas de bancos de antes da checagem de repetidas.
+
+        Repetições que já estavam no estoque ficam sem hash (o índice único
+        aceita NULL) e são só contadas; nada é apagado.
+        """
+        # Bancos de antes do arquivamento ganham contas_arquivo agora, já com o hash:
+        # cada tabela é conferida separadamente
+        sem_hash = []
+        for tabela in ('contas', 'contas_arquivo'):
+            cursor = await db.execute("SELECT name FROM pragma_table_info(?)", (tabela,))
+            if 'hash' not in {row[0] for row in await cursor.fetchall()}:
+                sem_hash.append(tabela)
+        if not sem_hash:
+            return
+
+        await db.create_function("hash_conta", 2, hash_conta, deterministic=True)
+        for tabela in sem_hash:
+            await db.execute(f"ALTER TABLE {tabela} ADD COLUMN hash INTEGER")
+        if 'contas' in sem_hash:
+            await db.execute('''
+                UPDATE contas SET hash = hash_conta(login, senha)
+                WHERE id IN (SELECT min(id) FROM contas GROUP BY guild_id, hash_conta(login, senha))
+            ''')
+        if 'contas_arquivo' in sem_hash:
+            await db.execute("UPDATE contas_arquivo SET hash = hash_conta(login, senha)")
+        # A visão lista as colunas de COLUNAS_CONTAS: é recriada logo abaixo já com o hash
+        await db.execute("DROP VIEW IF EXISTS contas_todas")
+        cursor = await db.execute("SELECT COUNT(*) FROM contas WHERE hash IS NULL")
+        repetidas = (await cursor.fetchone())[0]
+        if repetidas:
+            print(f"⚠️ {repetidas} contas repetidas já estavam no estoque (ficaram sem hash)")
+        print("✅ Hash das contas preenchido")
+
+    async def close(self):
+        await self.pool.fechar()
     
-    async def get_todas_contas(self):
-        async with aiosqlite.connect(self.db_path) as db:
+    async def add_conta(self, guild_id, jogo, categoria, login, senha):
+        """Adiciona uma conta; retorna False se ela já estava no estoque ou no arquivo."""
+        adicionadas, _, falhas = await self.add_contas_bulk(guild_id, [(jogo, categoria, login, senha)])
+        if falhas:
+            raise aiosqlite.Error(falhas[0][1])
+        return adicionadas == 1
+
+    async def add_contas_bulk(self, guild_id, contas, tamanho_lote=1000):
+        """Insere várias contas (jogo, categoria, login, senha) do servidor em lotes transacionais.
+
+        Cada lote é um `executemany` numa única transação, depois de uma consulta
+        só (por hash, no estoque e no arquivo) tirar as contas que já existem.
+        Se o lote falhar, ele é refeito linha a linha para que só as linhas
+        problemáticas fiquem de fora. Retorna (adicionadas, duplicadas, falhas),
+        onde falhas é uma lista de (índice, erro).
+        """
+        adicionadas = 0
+        duplicadas = 0
+        falhas = []
+        lote = []
+
+        async def sem_repetidas(db, lote):
+            hashes = json.dumps([linha[-1] for _, linha in lote])
+            cursor = await db.execute('''
+                SELECT hash FROM contas WHERE guild_id = ? AND hash IN (SELECT value FROM json_each(?))
+                UNION ALL
+                SELECT hash FROM contas_arquivo WHERE guild_id = ? AND hash IN (SELECT value FROM json_each(?))
+            ''', (guild_id, hashes, guild_id, hashes))
+            vistos = {row[0] for row in await cursor.fetchall()}
+            novas = []
+            for indice, linha in lote:
+                if linha[-1] not in vistos:
+                    vistos.add(linha[-1])
+                    novas.append((indice, linha))
+            return novas
+
+        async def gravar(lote):
+            nonlocal adicionadas, duplicadas
+            sql = "INSERT INTO contas (guild_id, jogo, categoria, login, senha, hash) VALUES (?, ?, ?, ?, ?, ?)"
+            try:
+                async with self.pool.escrita() as db:
+                    novas = await sem_repetidas(db, lote)
+                    await db.executemany(sql, [linha for _, linha in novas])
+                gravadas = [linha for _, linha in novas]
+            except aiosqlite.Error:
+                # Um statement com erro não desfaz a transação, só a própria linha
+                gravadas = []
+                async with self.pool.escrita() as db:
+                    novas = await sem_repetidas(db, lote)
+                    for indice, linha in novas:
+                        try:
+                            await db.execute(sql, linha)
+                            gravadas.append(linha)
+                        except aiosqlite.Error as e:
+                            falhas.append((indice, str(e)))
+            adicionadas += len(gravadas)
+            duplicadas += len(lote) - len(novas)
+            # Só depois do commit o estoque em memória muda
+            for jogo, quantidade in Counter(linha[1] for linha in gravadas).items():
+                self.estoque.somar(guild_id, jogo, quantidade)
+
+        for indice, (jogo, categoria, login, senha) in enumerate(contas):
+            try:
+                lote.append((indice, (
+                    guild_id, jogo.strip().title(), categoria.strip().title(), login, senha, hash_conta(login, senha)
+                )))
+            except AttributeError as e:
+                falhas.append((indice, str(e)))
+                continue
+            if len(lote) >= tamanho_lote:
+                await gravar(lote)
+                lote = []
+        if lote:
+            await gravar(lote)
+        return adicionadas, duplicadas, falhas
+
+    async def buscar_jogos(self, guild_id, termo, limite=5):
+        """Jogos com estoque no servidor que contêm `termo`, do mais relevante ao menos."""
+        termo = normalizar_termo(termo)
+        if not termo:
+            return []
+        async with self.pool.leitura() as db:
+            if len(termo) >= 3:
+                cursor = await db.execute('''
+                    SELECT j.nome, j.disponiveis
+                    FROM jogos_fts f JOIN jogos j ON j.id = f.rowid
+                    WHERE jogos_fts MATCH ? AND j.guild_id = ? AND j.disponiveis > 0
+                    ORDER BY lower(j.nome) = lower(?) DESC, j.nome LIKE ? DESC,
+                             bm25(jogos_fts), length(j.nome)
+                    LIMIT ?
+                ''', (frase_fts(termo), guild_id, termo, f"{termo}%", limite))
+            else:
+                # Trigram não indexa termos com menos de 3 caracteres
+                cursor = await db.execute('''
+                    SELECT nome, disponiveis FROM jogos
+                    WHERE guild_id = ? AND disponiveis > 0 AND nome LIKE ?
+                    ORDER BY nome LIKE ? DESC, length(nome)
+                    LIMIT ?
+                ''', (guild_id, f"%{termo}%", f"{termo}%", limite))
+            return await cursor.fetchall()
+
+    async def sugerir_jogos(self, guild_id, termo, limite=3):
+        """Sugestões "você quis dizer" para termos com erro de digitação."""
+        termo = normalizar_termo(termo).lower()
+        trigramas = {termo[i:i + 3] for i in range(len(termo) - 2)}
+        if not trigramas:
+            return []
+        consulta = " OR ".join(frase_fts(t) for t in trigramas)
+        async with self.pool.leitura() as db:
+            cursor = await db.execute('''
+                SELECT j.nome
+                FROM jogos_fts f JOIN jogos j ON j.id = f.rowid
+                WHERE jogos_fts MATCH ? AND j.guild_id = ? AND j.disponiveis > 0
+                ORDER BY f.rank LIMIT 50
+            ''', (consulta, guild_id))
+            candidatos = [row[0] for row in await cursor.fetchall()]
+
+        pontuados = sorted(
+            ((difflib.SequenceMatcher(None, termo, nome.lower()).ratio(), nome) for nome in candidatos),
+            reverse=True
+        )
+        return [nome for nota, nome in pontuados if nota >= 0.5][:limite]
+
+    async def resgatar_conta(self, guild_id, nome_jogo, user_id):
+        """Escolhe e marca como usada uma conta do jogo num único UPDATE.
+
+        Duas buscas simultâneas nunca recebem o mesmo login: a seleção e a
+        marcação acontecem no mesmo statement, na fila de escrita. A conta só
+        é devolvida depois do commit.
+        """
+        for nome, _ in await self.buscar_jogos(guild_id, nome_jogo):
+            async def resgatar(db):
+                cursor = await db.execute('''
+                    UPDATE contas SET status = 'usada', usado_por = ?, usado_em = ?
+                    WHERE id = (
+                        SELECT id FROM contas WHERE guild_id = ? AND status = 'disponivel' AND jogo = ? LIMIT 1
+                    )
+                    RETURNING *
+                ''', (user_id, datetime.now(), guild_id, nome))
+                return await cursor.fetchall()
+            linhas = await self.pool.enfileirar(resgatar)
+            if linhas:
+                self.estoque.somar(guild_id, nome, -1)
+                return linhas[0]
+            # O estoque desse jogo acabou entre a busca e o resgate: tenta o próximo
+        return None
+
+    async def marcar_conta_usada(self, guild_id, conta_id, user_id):
+        async def marcar(db):
             cursor = await db.execute(
-                "SELECT categoria, jogo, login, senha, status FROM contas ORDER BY categoria, jogo"
+                "UPDATE contas SET status = 'usada', usado_por = ?, usado_em = ? "
+                "WHERE id = ? AND guild_id = ? AND status = 'disponivel' RETURNING jogo",
+                (user_id, datetime.now(), conta_id, guild_id)
             )
             return await cursor.fetchall()
+        for (jogo,) in await self.pool.enfileirar(marcar):
+            self.estoque.somar(guild_id, jogo, -1)
     
-    async def marcar_conta_usada(self, conta_id, user_id):
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "UPDATE contas SET status = 'usada', usado_por = ?, usado_em = ? WHERE id = ?",
-                (user_id, datetime.now(), conta_id)
-            )
-            await db.commit()
+    async def criar_key(self, guild_id, duracao, cargo, admin_id):
+        return (await self.criar_keys(guild_id, 1, duracao, cargo, admin_id))[0]
     
-    async def criar_key(self, duracao, cargo, admin_id):
-        key_code = f"NYUX-STORE-{''.join(random.choices(string.ascii_uppercase + string.digits, k=10))}"
-        async with aiosqlite.connect(self.db_path) as db:
-            try:
-                await db.execute(
-                    "INSERT INTO keys (key_code, duracao, cargo, criado_por) VALUES (?, ?, ?, ?)",
-                    (key_code, duracao, cargo, admin_id)
+    async def criar_keys(self, guild_id, quantidade, duracao, cargo, admin_id):
+        """Gera `quantidade` keys únicas do servidor e grava todas numa única transação."""
+        codigos = set()
+        
+        async def inserir(db):
+            while len(codigos) < quantidade:
+                novos = set()
+                while len(codigos) + len(novos) < quantidade:
+                    codigo = gerar_codigo_key()
+                    if codigo not in codigos:
+                        novos.add(codigo)
+                # Descarta os que já existem no banco com uma consulta só
+                cursor = await db.execute(
+                    "SELECT key_code FROM keys WHERE key_code IN (SELECT value FROM json_each(?))",
+                    (json.dumps(list(novos)),)
                 )
-                await db.commit()
-                return key_code
-            except:
-                return await self.criar_key(duracao, cargo, admin_id)
+                novos.difference_update(row[0] for row in await cursor.fetchall())
+                codigos.update(novos)
+            await db.executemany(
+                "INSERT INTO keys (key_code, duracao, cargo, criado_por, guild_id) VALUES (?, ?, ?, ?, ?)",
+                [(codigo, duracao, cargo, admin_id, guild_id) for codigo in codigos]
+            )
+        
+        await self.pool.enfileirar(inserir)
+        return list(codigos)
+    
+    async def validar_key(self, guild_id, key_code, user_id):
+        # Valida e marca a key no mesmo UPDATE: dois resgates simultâneos não levam a mesma key,
+        # e uma key só vale no servidor onde foi gerada
+        async def validar(db):
+            cursor = await db.execute('''
+                UPDATE keys SET usado_por = ?, usado_em = ?
+                WHERE key_code = ? AND guild_id = ? AND ativa = 1 AND usado_por IS NULL
+                RETURNING *
+            ''', (user_id, datetime.now(), key_code, guild_id))
+            return await cursor.fetchall()
+        linhas = await self.pool.enfileirar(validar)
+        return linhas[0] if linhas else None
+    
+    async def registrar_assinatura(self, guild_id, user_id, cargo_id, key_id, segundos):
+        """Cria ou renova a assinatura do cargo; retorna (id, expira_em).
+
+        Renovar uma assinatura ativa soma a duração ao vencimento atual, e uma
+        key lifetime deixa a assinatura sem vencimento.
+        """
+        agora = int(time.time())
+        expira_em = agora + segundos if segundos is not None else None
+        
+        async def registrar(db):
+            cursor = await db.execute('''
+                INSERT INTO assinaturas (guild_id, user_id, cargo_id, key_id, expira_em, ativa)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT (guild_id, user_id, cargo_id) DO UPDATE SET
+                    expira_em = CASE
+                        WHEN excluded.expira_em IS NULL THEN NULL
+                        WHEN assinaturas.ativa = 1 AND assinaturas.expira_em IS NULL THEN NULL
+                        WHEN assinaturas.ativa = 1 THEN max(assinaturas.expira_em, ?) + ?
+                        ELSE excluded.expira_em
+                    END,
+                    ativa = 1,
+                    key_id = excluded.key_id,
+                    inicio = CASE WHEN assinaturas.ativa = 1 THEN assinaturas.inicio ELSE CURRENT_TIMESTAMP END
+                RETURNING id, expira_em
+            ''', (guild_id, user_id, cargo_id, key_id, expira_em, agora, segundos))
+            return (await cursor.fetchall())[0]
+        return await self.pool.enfileirar(registrar)
     
-    async def validar_key(self, key_code, user_id):
-        async with aiosqlite.connect(self.db_path) as db:
+    async def get_assinaturas_pendentes(self):
+        """(expira_em, id) de todas as assinaturas ativas com vencimento."""
+        async with self.pool.leitura() as db:
             cursor = await db.execute(
-                "SELECT * FROM keys WHERE key_code = ? AND ativa = 1 AND usado_por IS NULL",
-                (key_code,)
+                "SELECT expira_em, id FROM assinaturas WHERE ativa = 1 AND expira_em IS NOT NULL"
             )
-            key = await cursor.fetchone()
-            if key:
-                await db.execute(
-                    "UPDATE keys SET usado_por = ?, usado_em = ? WHERE id = ?",
-                    (user_id, datetime.now(), key[0])
-                )
-                await db.commit()
-                return key
-            return None
+            return await cursor.fetchall()
+    
+    async def get_assinaturas_vencidas(self, ids, agora):
+        """(id, guild_id, user_id, cargo_id) das assinaturas ainda ativas e vencidas entre `ids`.
+
+        Ids cuja assinatura foi renovada depois de agendada ficam de fora.
+        """
+        async with self.pool.leitura() as db:
+            cursor = await db.execute('''
+                SELECT id, guild_id, user_id, cargo_id FROM assinaturas
+                WHERE id IN (SELECT value FROM json_each(?)) AND ativa = 1 AND expira_em <= ?
+            ''', (json.dumps(ids), agora))
+            return await cursor.fetchall()
     
-    async def set_config(self, chave, valor):
-        async with aiosqlite.connect(self.db_path) as db:
+    async def expirar_assinaturas(self, ids, agora):
+        """Desativa as assinaturas de `ids` cujo cargo já saiu (renovadas no meio do caminho ficam ativas)."""
+        if not ids:
+            return
+        async def expirar(db):
+            await db.execute('''
+                UPDATE assinaturas SET ativa = 0
+                WHERE id IN (SELECT value FROM json_each(?)) AND ativa = 1 AND expira_em <= ?
+            ''', (json.dumps(ids), agora))
+        await self.pool.enfileirar(expirar)
+    
+    async def set_config(self, chave, valor, guild_id=0):
+        """Grava uma config do servidor; guild 0 guarda as configs do bot todo."""
+        async def gravar(db):
             await db.execute(
-                "INSERT OR REPLACE INTO config (chave, valor) VALUES (?, ?)",
-                (chave, valor)
+                "INSERT OR REPLACE INTO config (guild_id, chave, valor) VALUES (?, ?, ?)",
+                (guild_id, chave, valor)
             )
-            await db.commit()
+        await self.pool.enfileirar(gravar)
     
-    async def get_config(self, chave):
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT valor FROM config WHERE chave = ?", (chave,))
+    async def get_config(self, chave, guild_id=0):
+        async with self.pool.leitura() as db:
+            cursor = await db.execute("SELECT valor FROM config WHERE guild_id = ? AND chave = ?", (guild_id, chave))
             result = await cursor.fetchone()
             return result[0] if result else None
     
-    async def get_estatisticas(self):
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM contas WHERE status = 'disponivel'")
-            disponiveis = (await cursor.fetchone())[0]
-            
-            cursor = await db.execute("SELECT COUNT(*) FROM contas")
-            total = (await cursor.fetchone())[0]
-            
-            cursor = await db.execute("SELECT COUNT(*) FROM contas WHERE status = 'usada'")
-            usadas = (await cursor.fetchone())[0]
-            
-            cursor = await db.execute("SELECT COUNT(*) FROM keys WHERE usado_por IS NULL")
-            keys_ativas = (await cursor.fetchone())[0]
+    async def get_configs(self, guild_id):
+        """Todas as configs do servidor, como dict."""
+        async with self.pool.leitura() as db:
+            cursor = await db.execute("SELECT chave, valor FROM config WHERE guild_id = ?", (guild_id,))
+            return dict(await cursor.fetchall())
+    
+    async def get_regras_categoria(self):
+        async with self.pool.leitura() as db:
+            cursor = await db.execute("SELECT termo, categoria, prioridade FROM regras_categoria")
+            return await cursor.fetchall()
+    
+    async def set_regra_categoria(self, termo, categoria, prioridade):
+        async def gravar(db):
+            await db.execute(
+                "INSERT OR REPLACE INTO regras_categoria (termo, categoria, prioridade) VALUES (?, ?, ?)",
+                (termo.strip().lower(), categoria.strip(), prioridade)
+            )
+        await self.pool.enfileirar(gravar)
+    
+    async def get_estatisticas(self, guild_id):
+        async with self.pool.leitura() as db:
+            cursor = await db.execute(
+                "SELECT escopo, status, total FROM contadores "
+                "WHERE guild_id = ? AND escopo IN ('contas', 'keys') AND total > 0",
+                (guild_id,)
+            )
+            totais = {(escopo, status): total for escopo, status, total in await cursor.fetchall()}
             
-            cursor = await db.execute("SELECT COUNT(DISTINCT categoria) FROM contas")
+            cursor = await db.execute('''
+                SELECT COUNT(*) FROM (
+                    SELECT categoria FROM contadores WHERE guild_id = ? AND escopo = 'categoria'
+                    GROUP BY categoria HAVING SUM(total) > 0
+                )
+            ''', (guild_id,))
             categorias = (await cursor.fetchone())[0]
             
             return {
-                'disponiveis': disponiveis,
-                'total': total,
-                'usadas': usadas,
-                'keys_ativas': keys_ativas,
+                'disponiveis': totais.get(('contas', 'disponivel'), 0),
+                'total': sum(total for (escopo, _), total in totais.items() if escopo == 'contas'),
+                'usadas': totais.get(('contas', 'usada'), 0),
+                'keys_ativas': totais.get(('keys', 'ativa'), 0),
                 'categorias': categorias
             }
+    
+    async def get_categorias(self, guild_id):
+        """(categoria, total) de cada categoria com contas no servidor, lido dos contadores."""
+        async with self.pool.leitura() as db:
+            cursor = await db.execute('''
+                SELECT categoria, SUM(total) FROM contadores WHERE guild_id = ? AND escopo = 'categoria'
+                GROUP BY categoria HAVING SUM(total) > 0 ORDER BY categoria
+            ''', (guild_id,))
+            return await cursor.fetchall()
+    
+    async def get_pagina_jogos(self, guild_id, categoria=None, depois=None, antes=None, limite=15):
+        """Uma página de (categoria, jogo, status, total), paginada por chave.
+
+        `depois`/`antes` são a chave (categoria, jogo, status) da última/primeira
+        linha da página atual. Busca `limite + 1` linhas para saber se há mais.
+        """
+        chave_cache = (guild_id, categoria, depois, antes, limite)
+        pagina = self._cache_paginas.get(chave_cache)
+        if pagina is not None:
+            return pagina
+        
+        filtros = ["guild_id = ?", "escopo = 'jogo'", "total > 0"]
+        params = [guild_id]
+        if categoria is not None:
+            filtros.append("categoria = ?")
+            params.append(categoria)
+        if depois is not None:
+            filtros.append("(categoria, jogo, status) > (?, ?, ?)")
+            params.extend(depois)
+        elif antes is not None:
+            filtros.append("(categoria, jogo, status) < (?, ?, ?)")
+            params.extend(antes)
+        ordem = "DESC" if antes is not None and depois is None else "ASC"
+        params.append(limite + 1)
+        
+        async with self.pool.leitura() as db:
+            cursor = await db.execute(f'''
+                SELECT categoria, jogo, status, total FROM contadores
+                WHERE {' AND '.join(filtros)}
+                ORDER BY categoria {ordem}, jogo {ordem}, status {ordem}
+                LIMIT ?
+            ''', params)
+            pagina = await cursor.fetchall()
+        self._cache_paginas.set(chave_cache, pagina)
+        return pagina
+
+    async def iterar_contas(self, guild_id, status=None, categoria=None, jogo=None, desde=None, ate=None,
+                            arquivo=True, lote=5000):
+        """Percorre as contas filtradas do servidor em lotes de linhas, paginando pelo id.
+
+        Cada lote usa uma conexão de leitura só pelo tempo da consulta, então
+        uma exportação longa não prende o pool nem segura o checkpoint do WAL.
+        `desde`/`ate` filtram `adicionado_em` (ate é exclusivo). Com `arquivo`,
+        as contas arquivadas vêm depois das quentes.
+        """
+        filtros = ["id > ?", "guild_id = ?"]
+        params = [guild_id]
+        if status is not None:
+            filtros.append("status = ?")
+            params.append(status)
+        if categoria is not None:
+            filtros.append("categoria = ?")
+            params.append(categoria)
+        if jogo is not None:
+            filtros.append("jogo LIKE ?")
+            params.append(f"%{jogo}%")
+        if desde is not None:
+            filtros.append("adicionado_em >= ?")
+            params.append(desde)
+        if ate is not None:
+            filtros.append("adicionado_em < ?")
+            params.append(ate)
+        
+        for tabela in ('contas', 'contas_arquivo') if arquivo else ('contas',):
+            sql = f'''
+                SELECT id, jogo, categoria, login, senha, status, adicionado_em, usado_por, usado_em
+                FROM {tabela} WHERE {' AND '.join(filtros)} ORDER BY id LIMIT ?
+            '''
+            ultimo_id = 0
+            while True:
+                async with self.pool.leitura() as db:
+                    cursor = await db.execute(sql, [ultimo_id, *params, lote])
+                    linhas = await cursor.fetchall()
+                if linhas:
+                    yield linhas
+                if len(linhas) < lote:
+                    break
+                ultimo_id = linhas[-1][0]
+    
+    async def _arquivar(self, origem, destino, colunas, filtro, corte, lote, prazo):
+        total = 0
+        while prazo is None or time.monotonic() < prazo:
+            # Um lote por transação: as escritas das interações entram entre um lote e outro
+            async with self.pool.escrita(imediata=True) as db:
+                cursor = await db.execute(
+                    f"SELECT id FROM {origem} WHERE {filtro} AND usado_em < ? LIMIT ?", (corte, lote)
+                )
+                ids = json.dumps([row[0] for row in await cursor.fetchall()])
+                await db.execute(f'''
+                    INSERT INTO {destino} ({colunas})
+                    SELECT {colunas} FROM {origem} WHERE id IN (SELECT value FROM json_each(?))
+                ''', (ids,))
+                cursor = await db.execute(f"DELETE FROM {origem} WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+                movidas = cursor.rowcount
+            total += movidas
+            if movidas < lote:
+                break
+        return total
+    
+    async def arquivar_contas(self, antes_de, lote=1000, prazo=None):
+        """Move contas usadas antes de `antes_de` para contas_arquivo; retorna quantas.
+
+        `prazo` (time.monotonic) interrompe entre lotes; o que sobrar vai na próxima vez.
+        """
+        return await self._arquivar(
+            'contas', 'contas_arquivo', COLUNAS_CONTAS, "status = 'usada'", antes_de, lote, prazo
+        )
+    
+    async def arquivar_keys(self, antes_de, lote=1000, prazo=None):
+        """Move keys resgatadas antes de `antes_de` para keys_arquivo; retorna quantas."""
+        return await self._arquivar(
+            'keys', 'keys_arquivo', COLUNAS_KEYS, "usado_por IS NOT NULL", antes_de, lote, prazo
+        )
+    
+    async def vacuum_incremental(self, paginas=None):
+        """Devolve ao sistema as páginas livres do arquivo; retorna os bytes recuperados.
+
+        Bancos criados antes do arquivamento estão com auto_vacuum desligado: o
+        primeiro chamado converte com um VACUUM completo (por isso roda na janela
+        de manutenção).
+        """
+        async with self.pool.sem_transacao() as db:
+            async def tamanho():
+                cursor = await db.execute(
+                    "SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()"
+                )
+                return (await cursor.fetchone())[0]
+            
+            antes = await tamanho()
+            cursor = await db.execute("PRAGMA auto_vacuum")
+            if (await cursor.fetchone())[0] != 2:
+                await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                await db.execute("VACUUM")
+            else:
+                # execute() do sqlite3 só dá um passo no statement (= uma página);
+                # o executescript roda o pragma até o fim
+                await db.executescript(
+                    f"PRAGMA incremental_vacuum({int(paginas)});" if paginas else "PRAGMA incremental_vacuum;"
+                )
+            await db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return antes - await tamanho()
+    
+    async def historico_usuario(self, guild_id, user_id, limite=15):
+        """Contas e keys que o usuário pegou no servidor, incluindo o arquivo.
+
+        Retorna (contas, keys): contas como (jogo, login, usado_em, arquivada),
+        keys como (key_code, duracao, cargo, usado_em, arquivada).
+        """
+        async with self.pool.leitura() as db:
+            cursor = await db.execute('''
+                SELECT jogo, login, usado_em, arquivado_em IS NOT NULL FROM contas_todas
+                WHERE guild_id = ? AND usado_por = ? ORDER BY usado_em DESC LIMIT ?
+            ''', (guild_id, user_id, limite))
+            contas = await cursor.fetchall()
+            cursor = await db.execute('''
+                SELECT key_code, duracao, cargo, usado_em, arquivado_em IS NOT NULL FROM keys_todas
+                WHERE guild_id = ? AND usado_por = ? ORDER BY usado_em DESC LIMIT ?
+            ''', (guild_id, user_id, limite))
+            return contas, await cursor.fetchall()
+
+    async def criar_importacao(self, guild_id, admin_id, canal_id, arquivo, conteudo):
+        async def inserir(db):
+            cursor = await db.execute(
+                "INSERT INTO importacoes (guild_id, admin_id, canal_id, arquivo) VALUES (?, ?, ?, ?)",
+                (guild_id, admin_id, canal_id, arquivo)
+            )
+            await db.execute(
+                "INSERT INTO importacoes_arquivos (importacao_id, conteudo) VALUES (?, ?)", (cursor.lastrowid, conteudo)
+            )
+            return cursor.lastrowid
+        return await self.pool.enfileirar(inserir)
+
+    async def get_importacao(self, importacao_id=None, mensagem_id=None):
+        """Job de importação como dict, pelo id ou pela mensagem de progresso."""
+        filtro, valor = ("id", importacao_id) if mensagem_id is None else ("mensagem_id", mensagem_id)
+        async with self.pool.leitura() as db:
+            cursor = await db.execute(f"SELECT * FROM importacoes WHERE {filtro} = ?", (valor,))
+            linha = await cursor.fetchone()
+            if linha is None:
+                return None
+            return dict(zip([c[0] for c in cursor.description], linha))
+
+    async def get_arquivo_importacao(self, importacao_id):
+        async with self.pool.leitura() as db:
+            cursor = await db.execute(
+                "SELECT conteudo FROM importacoes_arquivos WHERE importacao_id = ?", (importacao_id,)
+            )
+            linha = await cursor.fetchone()
+            return linha[0] if linha else None
+
+    async def atualizar_importacao(self, importacao_id, **campos):
+        # Nomes de coluna vêm sempre do código, nunca do usuário
+        atribuicoes = ", ".join(f"{coluna} = ?" for coluna in campos)
+
+        async def gravar(db):
+            await db.execute(
+                f"UPDATE importacoes SET {atribuicoes} WHERE id = ?", (*campos.values(), importacao_id)
+            )
+        await self.pool.enfileirar(gravar)
+
+    async def terminar_importacao(self, importacao_id, status):
+        """Fecha o job (concluida, cancelada ou erro) e apaga o arquivo guardado."""
+        async def gravar(db):
+            await db.execute(
+                "UPDATE importacoes SET status = ?, terminado_em = ? WHERE id = ?",
+                (status, datetime.now(), importacao_id)
+            )
+            await db.execute("DELETE FROM importacoes_arquivos WHERE importacao_id = ?", (importacao_id,))
+        await self.pool.enfileirar(gravar)
+
+    async def get_importacoes_abertas(self):
+        """Ids dos jobs na fila ou interrompidos no meio, na ordem em que foram criados."""
+        async with self.pool.leitura() as db:
+            cursor = await db.execute(
+                "SELECT id FROM importacoes WHERE status IN ('pendente', 'rodando') ORDER BY id"
+            )
+            return [row[0] for row in await cursor.fetchall()]
+
+# Tempo de cada método do banco, rotulado pelo nome do método
+metricas.instrumentar(Database, "db_segundos", "metodo")
+
+class CacheCargos:
+    """Nome do cargo → ID, por servidor.
+
+    Evita varrer `guild.roles` a cada interação; os eventos de cargo do
+    gateway invalidam o servidor afetado.
+    """
+    
+    def __init__(self):
+        self._por_guild = {}
+    
+    def id_por_nome(self, guild, nome):
+        mapa = self._por_guild.get(guild.id)
+        if mapa is None:
+            mapa = {}
+            for role in guild.roles:
+                # Com nomes repetidos vale o primeiro, como no discord.utils.get
+                mapa.setdefault(role.name, role.id)
+            self._por_guild[guild.id] = mapa
+        return mapa.get(nome)
+    
+    def cargo(self, guild, nome):
+        role_id = self.id_por_nome(guild, nome)
+        return guild.get_role(role_id) if role_id else None
+    
+    def membro_tem(self, member, nome):
+        if getattr(member, 'guild', None) is None:
+            return False
+        role_id = self.id_por_nome(member.guild, nome)
+        return role_id is not None and member.get_role(role_id) is not None
+    
+    def invalidar(self, guild_id):
+        self._por_guild.pop(guild_id, None)
+
+CARGO_VIP = "Vip Pack"
+
+class ConfigGuilds:
+    """Configs de cada servidor (cargos de admin/VIP) em memória.
+
+    Carrega do banco na primeira interação do servidor; `definir` grava e
+    atualiza o cache, então não há leitura do banco nas checagens seguintes.
+    """
+    
+    def __init__(self):
+        self._por_guild = {}
+    
+    async def get(self, guild_id):
+        config = self._por_guild.get(guild_id)
+        if config is None:
+            config = self._por_guild[guild_id] = await db.get_configs(guild_id)
+        return config
+    
+    async def definir(self, guild_id, chave, valor):
+        await db.set_config(chave, valor, guild_id)
+        (await self.get(guild_id))[chave] = valor
+    
+    def invalidar(self, guild_id):
+        self._por_guild.pop(guild_id, None)
+
+async def _cargo_configurado(interaction, chave):
+    """None se o servidor não configurou o cargo, senão se o usuário o tem."""
+    cargo_id = (await configs.get(interaction.guild.id)).get(chave)
+    if cargo_id is None:
+        return None
+    return interaction.user.get_role(int(cargo_id)) is not None
+
+async def eh_admin(interaction):
+    """Dono do bot, dono do servidor ou quem tem o cargo de admin configurado."""
+    if interaction.user.id == ADMIN_ID:
+        return True
+    if interaction.guild is None:
+        return False
+    if interaction.user.id == interaction.guild.owner_id:
+        return True
+    return bool(await _cargo_configurado(interaction, 'cargo_admin'))
+
+async def eh_vip(interaction):
+    """Admins, ou quem tem o cargo VIP do servidor (ou o "Vip Pack" se nenhum foi configurado)."""
+    if await eh_admin(interaction):
+        return True
+    if interaction.guild is None:
+        return False
+    tem = await _cargo_configurado(interaction, 'cargo_vip')
+    return tem if tem is not None else cargos.membro_tem(interaction.user, CARGO_VIP)
+
+# (guild, cargo) com 403 ao expirar: o aviso sai uma vez só, até voltar a funcionar
+cargos_sem_permissao = set()
+
+async def remover_cargos_expirados(ids, agora):
+    """Tira os cargos vencidos; retorna os ids que precisam de nova tentativa.
+
+    A assinatura só é desativada depois que o cargo saiu, ou quando o servidor,
+    o cargo ou o membro não existem mais.
+    """
+    # Antes do READY o cache de servidores está vazio e get_guild devolve None para todos
+    await bot.wait_until_ready()
+    removidas, falhas = [], []
+    proibidos = set()  # (guild, cargo) que deram 403 neste lote: nem tenta os outros membros
+    for assinatura_id, guild_id, user_id, cargo_id in await db.get_assinaturas_vencidas(ids, agora):
+        guild = bot.get_guild(guild_id)
+        if (guild is not None and guild.unavailable) or (guild_id, cargo_id) in proibidos:
+            falhas.append(assinatura_id)
+            continue
+        cargo = guild.get_role(cargo_id) if guild else None
+        if cargo is not None:
+            try:
+                # Sem chunking de membros (modo sharded) o membro pode não estar em cache
+                membro = guild.get_member(user_id) or await guild.fetch_member(user_id)
+                await membro.remove_roles(cargo, reason="Key expirada")
+            except discord.NotFound:
+                pass
+            except discord.Forbidden as e:
+                # Sem Gerenciar Cargos ou cargo acima do bot: a assinatura continua ativa
+                # (o membro ainda tem o cargo) e volta com espera exponencial
+                proibidos.add((guild_id, cargo_id))
+                if (guild_id, cargo_id) not in cargos_sem_permissao:
+                    cargos_sem_permissao.add((guild_id, cargo_id))
+                    print(f"❌ Sem permissão para tirar o cargo {cargo_id} no servidor {guild_id}: {e}")
+                falhas.append(assinatura_id)
+                continue
+            except discord.HTTPException as e:
+                print(f"❌ Erro ao remover cargo {cargo_id} de {user_id}: {e}")
+                falhas.append(assinatura_id)
+                continue
+            cargos_sem_permissao.discard((guild_id, cargo_id))
+        removidas.append(assinatura_id)
+    await db.expirar_assinaturas(removidas, agora)
+    return falhas
 
 db = Database()
+cargos = CacheCargos()
+configs = ConfigGuilds()
+classificador = Classificador()
+
+# Token buckets por ação: (capacidade, tokens por segundo)
+LIMITES = {
+    "vip_buscar": {"usuario": (3, 1 / 20), "global": (50, 25)},
+    "resgatar_key": {"usuario": (5, 1 / 30), "global": (50, 25)},
+    "admin_add": {"usuario": (30, 2)},
+    "admin_key": {"usuario": (10, 1)},
+}
+limitador = Limitador(LIMITES)
+expiracoes = AgendadorExpiracao(remover_cargos_expirados)
+
+async def manutencao_banco(prazo=None):
+    """Arquiva o que é antigo e devolve o espaço livre ao disco; retorna o relatório."""
+    inicio = time.perf_counter()
+    corte = datetime.now() - timedelta(days=ARQUIVAR_APOS_DIAS)
+    contas = await db.arquivar_contas(corte, prazo=prazo)
+    keys = await db.arquivar_keys(corte, prazo=prazo)
+    recuperados = await db.vacuum_incremental()
+    relatorio = {
+        'quando': datetime.now(FUSO).strftime('%Y-%m-%d %H:%M'),
+        'contas_arquivadas': contas,
+        'keys_arquivadas': keys,
+        'bytes_recuperados': recuperados,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
+    metricas.incrementar("contas_arquivadas_total", contas)
+    metricas.incrementar("keys_arquivadas_total", keys)
+    metricas.definir("bytes_recuperados_ultima_manutencao", recuperados)
+    await db.set_config('ultima_manutencao', json.dumps(relatorio))
+    print(
+        f"🧹 Manutenção: {contas} contas e {keys} keys arquivadas, "
+        f"{recuperados / 1024 / 1024:.1f} MB recuperados em {relatorio['segundos']}s"
+    )
+    return relatorio
+
+manutencoes = AgendadorManutencao(manutencao_banco, FUSO, *JANELA_MANUTENCAO)
+
+async def gravar_bloco_importacao(guild_id, bloco):
+    # Classifica cada nome uma vez só: o bloco roda no event loop e repete muito jogo
+    categorias = {jogo: classificador.categoria(jogo) for jogo in {jogo for jogo, _, _ in bloco}}
+    adicionadas, duplicadas, falhas = await db.add_contas_bulk(
+        guild_id,
+        ((jogo, categorias[jogo], login, senha) for jogo, login, senha in bloco),
+        tamanho_lote=len(bloco)
+    )
+    metricas.incrementar("contas_importadas_total", adicionadas)
+    metricas.incrementar("contas_duplicadas_total", duplicadas)
+    for _, erro in falhas:
+        print(f"Erro: {erro}")
+    return adicionadas, duplicadas, len(falhas)
+
+TITULOS_IMPORTACAO = {
+    'pendente': ("⏳ Importação na Fila", discord.Color.light_grey()),
+    'rodando': ("📥 Importando...", discord.Color.blurple()),
+    'concluida': ("✅ Importação Concluída!", discord.Color.green()),
+    'cancelada': ("🛑 Importação Cancelada", discord.Color.orange()),
+    'erro': ("❌ Importação Falhou", discord.Color.red()),
+}
+
+def embed_importacao(job, contas=None):
+    titulo, cor = TITULOS_IMPORTACAO[job['status']]
+    embed = discord.Embed(
+        title=titulo,
+        description=f"Arquivo: `{job['arquivo']}`",
+        color=cor,
+        timestamp=datetime.now()
+    )
+    if job['total'] is not None:
+        feito = job['processadas'] / job['total'] if job['total'] else 1
+        barra = "▰" * round(feito * 20) + "▱" * (20 - round(feito * 20))
+        embed.add_field(
+            name="📦 Progresso", value=f"`{barra}` {feito:.0%} ({job['processadas']}/{job['total']})", inline=False
+        )
+    embed.add_field(name="📊 Contas Adicionadas", value=str(job['adicionadas']), inline=True)
+    embed.add_field(name="♻️ Já Cadastradas", value=str(job['duplicadas']), inline=True)
+    embed.add_field(name="❌ Erros", value=str(job['erros']), inline=True)
+    
+    if contas is not None:
+        por_jogo = Counter(jogo for jogo, _, _ in contas)
+        cats = Counter()
+        for jogo, quantidade in por_jogo.items():
+            cats[classificador.categoria(jogo)] += quantidade
+        embed.add_field(name="🎮 Jogos Únicos", value=str(len(por_jogo)), inline=True)
+        embed.add_field(name="📂 Categorias", value=str(len(cats)), inline=True)
+        embed.add_field(name="🔍 Total Encontrado", value=str(len(contas)), inline=True)
+        if cats:
+            # Campo de embed tem limite de 1024 caracteres
+            cats_text = "\n".join(f"• {k}: {v}" for k, v in cats.most_common(15))
+            embed.add_field(name="📈 Por Categoria", value=f"```{cats_text}```", inline=False)
+    
+    embed.set_footer(text=f"NyuxStore - Importação #{job['id']}")
+    return embed
+
+async def avisar_importacao(job, contas=None):
+    """Edita a mensagem de progresso do job (mensagem comum do canal: não expira como a interação)."""
+    if not job['canal_id'] or not job['mensagem_id']:
+        return
+    canal = bot.get_channel(job['canal_id']) or await bot.fetch_channel(job['canal_id'])
+    opcoes = {} if job['status'] in ('pendente', 'rodando') else {'view': None}
+    await canal.get_partial_message(job['mensagem_id']).edit(embed=embed_importacao(job, contas), **opcoes)
+
+importacoes = ExecutorImportacoes(db, gravar_bloco_importacao, avisar_importacao, metricas=metricas)
+
+async def recarregar_classificador():
+    regras = await db.get_regras_categoria()
+    padrao = await db.get_config('categoria_padrao') or CATEGORIA_PADRAO
+    classificador.carregar(regras, padrao)
+    return classificador.total_regras
 
 class AdicionarContaModal(Modal, title="➕ Adicionar Nova Conta"):
     jogo = TextInput(label="Nome do Jogo", placeholder="Ex: Assassin's Creed Shadows", required=True)
@@ -185,51 +1324,79 @@ class AdicionarContaModal(Modal, title="➕ Adicionar Nova Conta"):
     login = TextInput(label="Login Steam", placeholder="Usuário da conta", required=True)
     senha = TextInput(label="Senha Steam", placeholder="Senha da conta", required=True)
     
+    @medir("modal", "adicionar_conta")
+    @limitador.limitado("admin_add")
     async def on_submit(self, interaction: discord.Interaction):
-        await db.add_conta(self.jogo.value, self.categoria.value, self.login.value, self.senha.value)
+        _, duplicadas, falhas = await db.add_contas_bulk(
+            interaction.guild_id, [(self.jogo.value, self.categoria.value, self.login.value, self.senha.value)]
+        )
+        if falhas:
+            return await interaction.response.send_message(f"❌ Erro: {falhas[0][1]}", ephemeral=True)
+        if duplicadas:
+            return await interaction.response.send_message("⚠️ Essa conta já foi cadastrada antes.", ephemeral=True)
         await interaction.response.send_message(
             f"✅ Conta adicionada!\n🎮 **{self.jogo.value}**\n📂 Categoria: {self.categoria.value}", 
             ephemeral=True
         )
 
+async def entregar_conta(interaction, nome):
+    """Resgata uma conta do jogo para o usuário e responde com login/senha (modal e /buscar)."""
+    conta = await db.resgatar_conta(interaction.guild_id, nome, interaction.user.id)
+    if conta:
+        metricas.incrementar("contas_resgatadas_total")
+        embed = discord.Embed(
+            title=f"🎮 {conta[1]}",
+            description="Conta encontrada! Aproveite seu jogo.",
+            color=discord.Color.green(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="👤 Login", value=f"`{conta[3]}`", inline=False)
+        embed.add_field(name="🔒 Senha", value=f"`{conta[4]}`", inline=False)
+        embed.add_field(name="⚠️ Aviso", value="Mude para **MODO OFFLINE** antes de jogar!", inline=False)
+        embed.set_footer(text="NyuxStore")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    else:
+        mensagem = "❌ Jogo não encontrado ou não disponível."
+        sugestoes = await db.sugerir_jogos(interaction.guild_id, nome)
+        if sugestoes:
+            mensagem += "\n💡 Você quis dizer: " + ", ".join(f"**{s}**" for s in sugestoes) + "?"
+        await interaction.response.send_message(mensagem, ephemeral=True)
+
 class BuscarJogoModal(Modal, title="🔍 Buscar Jogo"):
     nome = TextInput(label="Nome do Jogo", placeholder="Digite o nome do jogo...", required=True)
     
+    @medir("modal", "buscar_jogo")
+    @limitador.limitado("vip_buscar")
     async def on_submit(self, interaction: discord.Interaction):
-        conta = await db.buscar_conta(self.nome.value)
-        if conta:
-            embed = discord.Embed(
-                title=f"🎮 {conta[1]}",
-                description="Conta encontrada! Aproveite seu jogo.",
-                color=discord.Color.green(),
-                timestamp=datetime.now()
-            )
-            embed.add_field(name="👤 Login", value=f"`{conta[3]}`", inline=False)
-            embed.add_field(name="🔒 Senha", value=f"`{conta[4]}`", inline=False)
-            embed.add_field(name="⚠️ Aviso", value="Mude para **MODO OFFLINE** antes de jogar!", inline=False)
-            embed.set_footer(text="NyuxStore")
-            
-            await db.marcar_conta_usada(conta[0], interaction.user.id)
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-        else:
-            await interaction.response.send_message(
-                "❌ Jogo não encontrado ou não disponível.", 
-                ephemeral=True
-            )
+        await entregar_conta(interaction, self.nome.value)
 
 class ResgatarKeyModal(Modal, title="🎁 Resgatar Key"):
     key = TextInput(label="Sua Key", placeholder="NYUX-STORE-XXXXX", required=True)
     
+    @medir("modal", "resgatar_key")
+    @limitador.limitado("resgatar_key")
     async def on_submit(self, interaction: discord.Interaction):
-        key_data = await db.validar_key(self.key.value.upper(), interaction.user.id)
+        key_data = await db.validar_key(interaction.guild_id, self.key.value.upper(), interaction.user.id)
         if key_data:
             cargo_nome = key_data[3]
-            cargo = discord.utils.get(interaction.guild.roles, name=cargo_nome)
+            cargo = cargos.cargo(interaction.guild, cargo_nome) if interaction.guild else None
             
             if cargo:
                 await interaction.user.add_roles(cargo)
+                metricas.incrementar("keys_resgatadas_total")
+                try:
+                    segundos = duracao_em_segundos(key_data[2])
+                except ValueError:
+                    segundos = None
+                assinatura_id, expira_em = await db.registrar_assinatura(
+                    interaction.guild.id, interaction.user.id, cargo.id, key_data[0], segundos
+                )
+                if expira_em is not None:
+                    expiracoes.agendar(expira_em, assinatura_id)
+                validade = f"<t:{expira_em}:R>" if expira_em is not None else "nunca expira"
                 await interaction.response.send_message(
-                    f"✅ **Key resgatada!**\n🏆 Cargo: {cargo.mention}\n⏰ Duração: {key_data[2]}", 
+                    f"✅ **Key resgatada!**\n🏆 Cargo: {cargo.mention}\n⏰ Duração: {key_data[2]} ({validade})", 
                     ephemeral=True
                 )
             else:
@@ -242,32 +1409,45 @@ class PainelAdminView(View):
         super().__init__(timeout=None)
     
     @discord.ui.button(label="➕ Adicionar Conta", style=discord.ButtonStyle.green, custom_id="admin_add")
+    @medir("botao", "admin_add")
     async def add_conta(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != ADMIN_ID:
+        if not await eh_admin(interaction):
             return await interaction.response.send_message("❌ Sem permissão!", ephemeral=True)
         await interaction.response.send_modal(AdicionarContaModal())
     
     @discord.ui.button(label="🔑 Gerar Key", style=discord.ButtonStyle.blurple, custom_id="admin_key")
+    @medir("botao", "admin_key")
     async def gerar_key(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != ADMIN_ID:
+        if not await eh_admin(interaction):
             return await interaction.response.send_message("❌ Sem permissão!", ephemeral=True)
         
         class KeyModal(Modal, title="🔑 Gerar Key"):
             duracao = TextInput(label="Duração", placeholder="7d, 1m, 1a, lifetime", required=True)
             cargo = TextInput(label="Cargo", placeholder="Vip Pack", required=True)
             
+            @medir("modal", "gerar_key")
+            @limitador.limitado("admin_key")
             async def on_submit(modal_self, interaction: discord.Interaction):
-                key = await db.criar_key(modal_self.duracao.value, modal_self.cargo.value, interaction.user.id)
+                try:
+                    duracao_em_segundos(modal_self.duracao.value)
+                except ValueError:
+                    return await interaction.response.send_message(
+                        "❌ Duração inválida! Use 7d, 2s, 1m, 1a ou lifetime.", ephemeral=True
+                    )
+                key = await db.criar_key(
+                    interaction.guild_id, modal_self.duracao.value, modal_self.cargo.value, interaction.user.id
+                )
                 await interaction.response.send_message(f"🔑 Key gerada:\n`{key}`", ephemeral=True)
         
         await interaction.response.send_modal(KeyModal())
     
     @discord.ui.button(label="📊 Estatísticas", style=discord.ButtonStyle.gray, custom_id="admin_stats")
+    @medir("botao", "admin_stats")
     async def stats(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != ADMIN_ID:
+        if not await eh_admin(interaction):
             return await interaction.response.send_message("❌ Sem permissão!", ephemeral=True)
         
-        stats = await db.get_estatisticas()
+        stats = await db.get_estatisticas(interaction.guild_id)
         
         embed = discord.Embed(title="📊 Estatísticas NyuxStore", color=discord.Color.blue())
         embed.add_field(name="🎮 Jogos Disponíveis", value=str(stats['disponiveis']), inline=True)
@@ -278,18 +1458,36 @@ class PainelAdminView(View):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+class ImportacaoView(View):
+    def __init__(self):
+        super().__init__(timeout=None)
+    
+    @discord.ui.button(label="🛑 Cancelar Importação", style=discord.ButtonStyle.red, custom_id="importacao_cancelar")
+    @medir("botao", "importacao_cancelar")
+    async def cancelar(self, interaction: discord.Interaction, button: Button):
+        if not await eh_admin(interaction):
+            return await interaction.response.send_message("❌ Sem permissão!", ephemeral=True)
+        job = await db.get_importacao(mensagem_id=interaction.message.id)
+        if job is None or job['status'] not in ('pendente', 'rodando'):
+            return await interaction.response.send_message("⚠️ Essa importação já terminou.", ephemeral=True)
+        await interaction.response.send_message(
+            f"🛑 Cancelando a importação #{job['id']} (o bloco atual ainda é gravado)...", ephemeral=True
+        )
+        await importacoes.cancelar(job['id'])
+
 class PainelVipView(View):
     def __init__(self):
         super().__init__(timeout=None)
     
     @discord.ui.button(label="🔍 Buscar Jogo", style=discord.ButtonStyle.green, custom_id="vip_buscar")
+    @medir("botao", "vip_buscar")
     async def buscar(self, interaction: discord.Interaction, button: Button):
-        tem_cargo = any(role.name == "Vip Pack" for role in interaction.user.roles)
-        if not tem_cargo and interaction.user.id != ADMIN_ID:
+        if not await eh_vip(interaction):
             return await interaction.response.send_message("❌ Precisa do cargo @Vip Pack!", ephemeral=True)
         await interaction.response.send_modal(BuscarJogoModal())
     
     @discord.ui.button(label="🎁 Resgatar Key", style=discord.ButtonStyle.blurple, custom_id="vip_resgatar")
+    @medir("botao", "vip_resgatar")
     async def resgatar(self, interaction: discord.Interaction, button: Button):
         await interaction.response.send_modal(ResgatarKeyModal())
 
@@ -298,31 +1496,120 @@ class PainelPublicoView(View):
         super().__init__(timeout=None)
     
     @discord.ui.button(label="🎁 Resgatar Key", style=discord.ButtonStyle.green, custom_id="pub_resgatar")
+    @medir("botao", "pub_resgatar")
     async def resgatar(self, interaction: discord.Interaction, button: Button):
         await interaction.response.send_modal(ResgatarKeyModal())
 
-class NyuxBot(discord.Client):
+# Com muitos servidores um processo só atende todos os shards; o chunking de
+# membros na subida é desligado nesse modo porque domina o tempo até o ready
+ClienteBase = discord.AutoShardedClient if AUTO_SHARD else discord.Client
+
+class NyuxBot(ClienteBase):
     def __init__(self):
-        super().__init__(intents=intents)
+        opcoes = {}
+        if AUTO_SHARD:
+            opcoes['chunk_guilds_at_startup'] = False
+            if SHARD_COUNT:
+                opcoes['shard_count'] = SHARD_COUNT
+        super().__init__(intents=intents, **opcoes)
         self.tree = app_commands.CommandTree(self)
+        self._pronto = False
     
     async def setup_hook(self):
         await db.init()
+        await recarregar_classificador()
+        expiracoes.carregar(await db.get_assinaturas_pendentes())
+        expiracoes.iniciar()
+        manutencoes.iniciar()
+        await metricas.iniciar(METRICS_HOST, METRICS_PORT)
         self.add_view(PainelAdminView())
         self.add_view(PainelVipView())
         self.add_view(PainelPublicoView())
+        self.add_view(ImportacaoView())
+        importacoes.iniciar()
+        abertas = await db.get_importacoes_abertas()
+        for importacao_id in abertas:
+            importacoes.enfileirar(importacao_id)
+        if abertas:
+            print(f"📥 Retomando {len(abertas)} importação(ões) pendente(s)")
+        await self.sincronizar_comandos()
+    
+    def hash_comandos(self, guild=None):
+        """Hash do schema dos comandos como o Discord recebe no sync."""
+        comandos = sorted(
+            (c.to_dict(self.tree) for c in self.tree.get_commands(guild=guild)),
+            key=lambda c: (c.get('type', 1), c['name'])
+        )
+        schema = json.dumps([self.application_id, comandos], sort_keys=True, default=str)
+        return hashlib.sha256(schema.encode()).hexdigest()
+    
+    async def sincronizar_comandos(self):
+        """Sobe os comandos só quando o schema mudou desde o último sync."""
+        guild = discord.Object(id=SYNC_GUILD_ID) if SYNC_GUILD_ID else None
+        if guild:
+            self.tree.copy_global_to(guild=guild)
+        chave = f'comandos_hash:{SYNC_GUILD_ID}' if guild else 'comandos_hash'
+        
+        atual = self.hash_comandos(guild)
+        if not FORCAR_SYNC and await db.get_config(chave) == atual:
+            print('✅ Comandos sem mudanças, sync ignorado')
+            return
+        
+        inicio = time.perf_counter()
+        try:
+            await self.tree.sync(guild=guild)
+        except discord.HTTPException as e:
+            # Roda no setup_hook: um 429 aqui não pode impedir o login. Sem gravar
+            # o hash, a próxima subida tenta de novo.
+            print(f'⚠️ Falha ao sincronizar comandos, fica para a próxima subida: {e}')
+            return
+        await db.set_config(chave, atual)
+        destino = f'no servidor {SYNC_GUILD_ID}' if guild else 'globalmente'
+        print(f'✅ Comandos sincronizados {destino} em {time.perf_counter() - inicio:.2f}s')
+    
+    async def close(self):
+        await expiracoes.parar()
+        await manutencoes.parar()
+        # A importação em andamento fica como 'rodando' e continua na próxima subida
+        await importacoes.parar()
+        await metricas.parar()
+        await super().close()
+        await db.close()
+    
+    async def on_guild_role_create(self, role):
+        cargos.invalidar(role.guild.id)
+    
+    async def on_guild_role_delete(self, role):
+        cargos.invalidar(role.guild.id)
+    
+    async def on_guild_role_update(self, before, after):
+        cargos.invalidar(after.guild.id)
+    
+    async def on_guild_remove(self, guild):
+        cargos.invalidar(guild.id)
+        configs.invalidar(guild.id)
+    
+    async def on_shard_ready(self, shard_id):
+        print(f'✅ Shard {shard_id} pronto')
     
     async def on_ready(self):
         print(f'✅ Bot online: {self.user}')
         print(f'✅ ID: {self.user.id}')
-        await self.tree.sync()
-        print('✅ Comandos sincronizados')
+        print(f'✅ {len(self.guilds)} servidores · {self.shard_count or 1} shard(s)')
+        # on_ready dispara de novo a cada reconexão; o tempo de subida só vale na primeira
+        if not self._pronto:
+            self._pronto = True
+            segundos = time.monotonic() - INICIO_PROCESSO
+            metricas.definir('tempo_ate_pronto_segundos', segundos)
+            print(f'✅ Pronto em {segundos:.2f}s')
 
 bot = NyuxBot()
 
 @bot.tree.command(name="painel_admin", description="[ADMIN] Painel administrativo")
+@app_commands.guild_only()
+@medir("comando", "painel_admin")
 async def painel_admin(interaction: discord.Interaction):
-    if interaction.user.id != ADMIN_ID:
+    if not await eh_admin(interaction):
         return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
     
     embed = discord.Embed(
@@ -333,9 +1620,10 @@ async def painel_admin(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed, view=PainelAdminView(), ephemeral=True)
 
 @bot.tree.command(name="painel_vip", description="[VIP] Acesse seus jogos")
+@app_commands.guild_only()
+@medir("comando", "painel_vip")
 async def painel_vip(interaction: discord.Interaction):
-    tem_cargo = any(role.name == "Vip Pack" for role in interaction.user.roles)
-    if not tem_cargo and interaction.user.id != ADMIN_ID:
+    if not await eh_vip(interaction):
         return await interaction.response.send_message("❌ Precisa do @Vip Pack!", ephemeral=True)
     
     embed = discord.Embed(
@@ -345,9 +1633,30 @@ async def painel_vip(interaction: discord.Interaction):
     )
     await interaction.response.send_message(embed=embed, view=PainelVipView(), ephemeral=True)
 
+@bot.tree.command(name="buscar", description="[VIP] Pega uma conta do jogo escolhido")
+@app_commands.guild_only()
+@app_commands.describe(jogo="Comece a digitar e escolha um jogo da lista")
+@medir("comando", "buscar")
+@limitador.limitado("vip_buscar", metodo=False)
+async def buscar(interaction: discord.Interaction, jogo: str):
+    if not await eh_vip(interaction):
+        return await interaction.response.send_message("❌ Precisa do @Vip Pack!", ephemeral=True)
+    await entregar_conta(interaction, jogo)
+
+@buscar.autocomplete("jogo")
+@medir("autocomplete", "buscar")
+async def buscar_autocomplete(interaction: discord.Interaction, atual: str):
+    # Só memória: o Discord descarta respostas de autocomplete depois de 3s
+    return [
+        app_commands.Choice(name=f"{nome} — {disponiveis} em estoque"[:100], value=nome[:100])
+        for nome, disponiveis in db.estoque.sugerir(interaction.guild_id, atual)
+    ]
+
 @bot.tree.command(name="setup", description="[ADMIN] Painel público")
+@app_commands.guild_only()
+@medir("comando", "setup")
 async def setup(interaction: discord.Interaction):
-    if interaction.user.id != ADMIN_ID:
+    if not await eh_admin(interaction):
         return await interaction.response.send_message("❌ Sem permissão!", ephemeral=True)
     
     embed = discord.Embed(
@@ -358,10 +1667,39 @@ async def setup(interaction: discord.Interaction):
     await interaction.channel.send(embed=embed, view=PainelPublicoView())
     await interaction.response.send_message("✅ Painel enviado!", ephemeral=True)
 
+@bot.tree.command(name="configurar", description="[ADMIN] Cargos de admin e VIP deste servidor")
+@app_commands.guild_only()
+@app_commands.describe(
+    cargo_admin="Quem tem esse cargo usa os comandos de admin",
+    cargo_vip="Quem tem esse cargo acessa o painel VIP"
+)
+@medir("comando", "configurar")
+async def configurar(
+    interaction: discord.Interaction,
+    cargo_admin: discord.Role = None,
+    cargo_vip: discord.Role = None
+):
+    if not await eh_admin(interaction):
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
+    
+    if cargo_admin:
+        await configs.definir(interaction.guild_id, 'cargo_admin', str(cargo_admin.id))
+    if cargo_vip:
+        await configs.definir(interaction.guild_id, 'cargo_vip', str(cargo_vip.id))
+    
+    config = await configs.get(interaction.guild_id)
+    admin = f"<@&{config['cargo_admin']}>" if 'cargo_admin' in config else "só o dono do servidor"
+    vip = f"<@&{config['cargo_vip']}>" if 'cargo_vip' in config else f"@{CARGO_VIP} (padrão)"
+    await interaction.response.send_message(
+        f"⚙️ **Configuração do servidor**\n🔧 Admin: {admin}\n⭐ VIP: {vip}", ephemeral=True
+    )
+
 @bot.tree.command(name="importar", description="[ADMIN] Importa contas do arquivo .txt")
+@app_commands.guild_only()
 @app_commands.describe(arquivo="Arquivo contas_steam_nyuxstore.txt")
+@medir("comando", "importar")
 async def importar(interaction: discord.Interaction, arquivo: discord.Attachment):
-    if interaction.user.id != ADMIN_ID:
+    if not await eh_admin(interaction):
         return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
     
     await interaction.response.defer(ephemeral=True, thinking=True)
@@ -371,186 +1709,393 @@ async def importar(interaction: discord.Interaction, arquivo: discord.Attachment
     
     try:
         conteudo = await arquivo.read()
-        texto = conteudo.decode('utf-8', errors='ignore')
-        
-        # Sistema inteligente de parsing
-        contas_encontradas = []
-        
-        # Divide por seções de conta (CONTA XXX)
-        secoes = re.split(r'={10,}\s*CONTA\s*\d+', texto)
-        
-        for secao in secoes:
-            if not secao.strip():
-                continue
-            
-            # Extrai nome do jogo
-            jogo = "Desconhecido"
-            categoria = "Geral"
-            
-            # Procura padrões de nome de jogo
-            padroes_jogo = [
-                r'🎮\s*Jogo:\s*(.+?)(?=\n|$)',
-                r'Jogo:\s*(.+?)(?=\n|$)',
-                r'Games?:\s*(.+?)(?=\n|$)',
-                r'🎮\s*(.+?)(?=\n|$)'
-            ]
-            
-            for padrao in padroes_jogo:
-                match = re.search(padrao, secao, re.IGNORECASE)
-                if match:
-                    jogo = match.group(1).strip()
-                    break
-            
-            # Define categoria automaticamente
-            jogo_lower = jogo.lower()
-            if any(x in jogo_lower for x in ['car', 'forza', 'speed', 'truck', 'f1', 'corrida', 'nfs', 'grid']):
-                categoria = "Corrida"
-            elif any(x in jogo_lower for x in ['call of duty', 'cod', 'cs', 'battlefield', 'war', 'tiro', 'fps', 'shooter']):
-                categoria = "FPS/Tiro"
-            elif any(x in jogo_lower for x in ['assassin', 'witcher', 'elden', 'souls', 'rpg', 'final fantasy', 'dragon']):
-                categoria = "RPG/Aventura"
-            elif any(x in jogo_lower for x in ['resident evil', 'horror', 'fear', 'terror', 'evil', 'dead']):
-                categoria = "Terror"
-            elif any(x in jogo_lower for x in ['fifa', 'pes', 'nba', 'esporte', 'football', 'soccer']):
-                categoria = "Esportes"
-            elif any(x in jogo_lower for x in ['simulator', 'simulation', 'tycoon', 'manager']):
-                categoria = "Simulador"
-            elif any(x in jogo_lower for x in ['lego', 'minecraft', 'cartoon']):
-                categoria = "Casual/Família"
-            else:
-                categoria = "Ação/Aventura"
-            
-            # Extrai login/senha - múltiplos formatos
-            logins_encontrados = []
-            
-            # Formato 1: Login: xxx / Senha: xxx (mesma linha ou próximas)
-            padrao1 = r'(?:Login|User|Usuário|Usuario):\s*(\S+).*?(?:Senha|Pass|Password):\s*(\S+)'
-            matches1 = re.findall(padrao1, secao, re.IGNORECASE | re.DOTALL)
-            logins_encontrados.extend(matches1)
-            
-            # Formato 2: Login em uma linha, Senha na próxima
-            linhas = secao.split('\n')
-            for i, linha in enumerate(linhas):
-                login_match = re.search(r'(?:Login|User|Usuário|Usuario):\s*(\S+)', linha, re.IGNORECASE)
-                if login_match and i + 1 < len(linhas):
-                    login = login_match.group(1)
-                    senha_match = re.search(r'(?:Senha|Pass|Password):\s*(\S+)', linhas[i + 1], re.IGNORECASE)
-                    if senha_match:
-                        logins_encontrados.append((login, senha_match.group(1)))
-            
-            # Formato 3: User: xxx / Pass: xxx
-            padrao3 = r'User:\s*(\S+).*?Pass:\s*(\S+)'
-            matches3 = re.findall(padrao3, secao, re.IGNORECASE | re.DOTALL)
-            for m in matches3:
-                if m not in logins_encontrados:
-                    logins_encontrados.append(m)
-            
-            # Adiciona contas encontradas
-            for login, senha in logins_encontrados:
-                # Limpa dados
-                login = login.strip().replace(':', '')
-                senha = senha.strip().replace(':', '')
-                
-                # Ignora se for muito curto ou exemplo
-                if len(login) > 2 and len(senha) > 2 and 'exemplo' not in login.lower():
-                    contas_encontradas.append({
-                        'jogo': jogo,
-                        'categoria': categoria,
-                        'login': login,
-                        'senha': senha
-                    })
-        
-        # Remove duplicados
-        contas_unicas = []
-        logins_vistos = set()
-        for conta in contas_encontradas:
-            chave = f"{conta['login']}:{conta['senha']}"
-            if chave not in logins_vistos:
-                logins_vistos.add(chave)
-                contas_unicas.append(conta)
-        
-        # Adiciona no banco de dados
-        adicionadas = 0
-        erros = 0
-        for conta in contas_unicas:
-            try:
-                await db.add_conta(
-                    conta['jogo'], 
-                    conta['categoria'], 
-                    conta['login'], 
-                    conta['senha']
-                )
-                adicionadas += 1
-            except Exception as e:
-                erros += 1
-                print(f"Erro: {e}")
-        
-        # Estatísticas - CORRIGIDO AQUI
-        jogos_unicos = len(set([c['jogo'] for c in contas_unicas]))
-        categorias_unicas = len(set([c['categoria'] for c in contas_unicas]))
+    except discord.HTTPException as e:
+        return await interaction.followup.send(f"❌ Não consegui baixar o arquivo: {e}", ephemeral=True)
+    metricas.incrementar("bytes_importados_total", len(conteudo))
+    
+    # O job roda fora da interação (o token dela expira em 15 minutos): o progresso
+    # vai numa mensagem do canal, editada pelo executor até o fim
+    importacao_id = await db.criar_importacao(
+        interaction.guild_id, interaction.user.id, interaction.channel_id, arquivo.filename, conteudo
+    )
+    job = await db.get_importacao(importacao_id)
+    try:
+        mensagem = await interaction.channel.send(embed=embed_importacao(job), view=ImportacaoView())
+        await db.atualizar_importacao(importacao_id, mensagem_id=mensagem.id)
+        onde = f" Acompanhe aqui: {mensagem.jump_url}"
+    except discord.HTTPException:
+        onde = ""
+    importacoes.enfileirar(importacao_id)
+    await interaction.followup.send(f"📥 Importação #{importacao_id} na fila.{onde}", ephemeral=True)
+
+@bot.tree.command(name="gerar_keys", description="[ADMIN] Gera várias keys de uma vez e envia em arquivo")
+@app_commands.guild_only()
+@app_commands.describe(
+    quantidade="Quantas keys gerar (até 10000)",
+    duracao="7d, 1m, 1a, lifetime",
+    cargo="Nome do cargo (ex: Vip Pack)",
+    formato="Formato do arquivo"
+)
+@medir("comando", "gerar_keys")
+async def gerar_keys(
+    interaction: discord.Interaction,
+    quantidade: app_commands.Range[int, 1, 10000],
+    duracao: str,
+    cargo: str,
+    formato: Literal["txt", "csv"] = "txt"
+):
+    if not await eh_admin(interaction):
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
+    
+    try:
+        duracao_em_segundos(duracao)
+    except ValueError:
+        return await interaction.response.send_message(
+            "❌ Duração inválida! Use 7d, 2s, 1m, 1a ou lifetime.", ephemeral=True
+        )
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    
+    inicio = time.perf_counter()
+    keys = await db.criar_keys(interaction.guild_id, quantidade, duracao, cargo, interaction.user.id)
+    metricas.incrementar("keys_geradas_total", len(keys))
+    tempo = time.perf_counter() - inicio
+    
+    if formato == "csv":
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        escritor.writerow(["key_code", "duracao", "cargo"])
+        escritor.writerows((k, duracao, cargo) for k in keys)
+        conteudo = saida.getvalue()
+    else:
+        conteudo = "\n".join(keys) + "\n"
+    arquivo = discord.File(io.BytesIO(conteudo.encode('utf-8')), filename=f"keys_{len(keys)}_{duracao}.{formato}")
+    
+    await interaction.followup.send(
+        f"🔑 **{len(keys)} keys geradas** ({duracao} · {cargo})\n⚡ {len(keys) / tempo:,.0f} keys/s",
+        file=arquivo,
+        ephemeral=True
+    )
+
+@bot.tree.command(name="regra_categoria", description="[ADMIN] Adiciona ou altera uma regra de categoria")
+@app_commands.guild_only()
+@app_commands.describe(
+    termo="Palavra ou expressão do nome do jogo (ex: racing)",
+    categoria="Categoria atribuída (ex: Corrida)",
+    prioridade="Menor vence quando várias regras casam"
+)
+@medir("comando", "regra_categoria")
+async def regra_categoria(interaction: discord.Interaction, termo: str, categoria: str, prioridade: int = 100):
+    # As regras de categoria valem para todos os servidores: só o dono do bot
+    if interaction.user.id != ADMIN_ID:
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
+    
+    await db.set_regra_categoria(termo, categoria, prioridade)
+    total = await recarregar_classificador()
+    await interaction.response.send_message(
+        f"✅ Regra salva: `{termo}` → **{categoria}** (prioridade {prioridade})\n📚 {total} regras ativas",
+        ephemeral=True
+    )
+
+@bot.tree.command(name="recarregar_categorias", description="[ADMIN] Recarrega as regras de categoria do banco")
+@app_commands.guild_only()
+@medir("comando", "recarregar_categorias")
+async def recarregar_categorias(interaction: discord.Interaction):
+    if interaction.user.id != ADMIN_ID:
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
+    
+    total = await recarregar_classificador()
+    await interaction.response.send_message(f"✅ {total} regras de categoria recarregadas!", ephemeral=True)
+
+def _formatar_latencias(linhas, campo):
+    texto = "\n".join(
+        f"{labels[campo][:22]:<22} {p50 * 1000:7.1f} {p95 * 1000:7.1f} {p99 * 1000:7.1f} {total:>6}"
+        for labels, p50, p95, p99, total in linhas
+    )
+    return f"```{'':<22} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'n':>6}\n{texto}```"[:1024]
+
+@bot.tree.command(name="metricas", description="[ADMIN] Latências e contadores do bot")
+@app_commands.guild_only()
+@medir("comando", "metricas")
+async def metricas_cmd(interaction: discord.Interaction):
+    # Métricas são do processo inteiro, não de um servidor
+    if interaction.user.id != ADMIN_ID:
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
+    
+    embed = discord.Embed(title="📈 Métricas NyuxStore", color=discord.Color.purple(), timestamp=datetime.now())
+    
+    interacoes = [
+        ({"nome": f"{labels['tipo']}:{labels['nome']}"}, p50, p95, p99, total)
+        for labels, p50, p95, p99, total in metricas.resumo("latencia_segundos")
+    ]
+    if interacoes:
+        embed.add_field(name="⏱️ Interações", value=_formatar_latencias(interacoes[:10], "nome"), inline=False)
+    
+    consultas = metricas.resumo("db_segundos")
+    if consultas:
+        embed.add_field(name="🗄️ Banco", value=_formatar_latencias(consultas[:10], "metodo"), inline=False)
+    
+    lag = metricas.resumo("loop_lag_segundos")
+    if lag:
+        _, p50, p95, p99, _ = lag[0]
+        embed.add_field(
+            name="🔁 Atraso do event loop",
+            value=f"p50 {p50 * 1000:.1f} ms · p95 {p95 * 1000:.1f} ms · p99 {p99 * 1000:.1f} ms",
+            inline=False
+        )
+    
+    contadores = "\n".join(
+        f"• {nome}: {valor}" for (nome, labels), valor in sorted(metricas.contadores.items()) if not labels
+    )
+    if contadores:
+        embed.add_field(name="🔢 Contadores", value=contadores[:1024], inline=False)
+    
+    embed.set_footer(text=f"NyuxStore - /metrics em {METRICS_HOST}:{METRICS_PORT}" if METRICS_PORT else "NyuxStore")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+class ListaView(View):
+    """Lista de jogos paginada: carrega uma página por vez, sem logins/senhas."""
+    
+    POR_PAGINA = 15
+    # Select aceita no máximo 25 opções: "Todas" + 24 categorias, ou, com mais que
+    # isso, 22 por página e as opções de trocar de página
+    CATEGORIAS_POR_SELECT = 24
+    CATEGORIAS_POR_PAGINA = 22
+    
+    def __init__(self, guild_id, categorias, total):
+        super().__init__(timeout=300)
+        self.guild_id = guild_id
+        self.categoria = None
+        self.total = total
+        self.categorias = list(categorias)
+        self.totais = dict(categorias)
+        self.linhas = []
+        self.tem_anterior = False
+        self.tem_proxima = False
+        self.pagina = 1
+        self.pagina_categorias = 0
+        self.montar_filtro()
+    
+    def montar_filtro(self):
+        if len(self.categorias) <= self.CATEGORIAS_POR_SELECT:
+            por_pagina = self.CATEGORIAS_POR_SELECT
+        else:
+            por_pagina = self.CATEGORIAS_POR_PAGINA
+        paginas = -(-len(self.categorias) // por_pagina)
+        inicio = self.pagina_categorias * por_pagina
         
-        # Cria embed de resultado
+        opcoes = [discord.SelectOption(label="Todas as categorias", value="*", emoji="📋")]
+        if inicio:
+            opcoes.append(discord.SelectOption(label="Categorias anteriores", value="*anteriores", emoji="⬅️"))
+        opcoes += [
+            discord.SelectOption(label=cat[:100], value=cat[:100], description=f"{qtd} contas")
+            for cat, qtd in self.categorias[inicio:inicio + por_pagina]
+        ]
+        if inicio + por_pagina < len(self.categorias):
+            opcoes.append(discord.SelectOption(label="Mais categorias", value="*mais", emoji="➡️"))
+        self.filtro.options = opcoes
+        self.filtro.placeholder = "📂 Filtrar por categoria" + (
+            f" ({self.pagina_categorias + 1}/{paginas})" if paginas > 1 else ""
+        )
+    
+    async def carregar(self, depois=None, antes=None):
+        linhas = await db.get_pagina_jogos(self.guild_id, self.categoria, depois=depois, antes=antes, limite=self.POR_PAGINA)
+        tem_mais = len(linhas) > self.POR_PAGINA
+        linhas = linhas[:self.POR_PAGINA]
+        if antes is not None:
+            linhas.reverse()
+            self.tem_anterior, self.tem_proxima = tem_mais, True
+        else:
+            self.tem_anterior, self.tem_proxima = depois is not None, tem_mais
+        self.linhas = linhas
+        self.anterior.disabled = not self.tem_anterior
+        self.proxima.disabled = not self.tem_proxima
+    
+    def embed(self):
+        total = self.total if self.categoria is None else self.totais.get(self.categoria, 0)
         embed = discord.Embed(
-            title="✅ Importação Concluída!",
-            description=f"Arquivo: `{arquivo.filename}`",
-            color=discord.Color.green(),
-            timestamp=datetime.now()
+            title="📋 Lista de Jogos Cadastrados",
+            description=f"Total: {total} contas" + (f" em **{self.categoria}**" if self.categoria else ""),
+            color=discord.Color.blue()
         )
         
-        embed.add_field(name="📊 Contas Adicionadas", value=str(adicionadas), inline=True)
-        embed.add_field(name="🎮 Jogos Únicos", value=str(jogos_unicos), inline=True)
-        embed.add_field(name="📂 Categorias", value=str(categorias_unicas), inline=True)
-        embed.add_field(name="❌ Erros", value=str(erros), inline=True)
-        embed.add_field(name="🔍 Total Encontrado", value=str(len(contas_unicas)), inline=True)
-        
-        # Lista categorias
-        cats = {}
-        for c in contas_unicas:
-            cats[c['categoria']] = cats.get(c['categoria'], 0) + 1
-        cats_text = "\n".join([f"• {k}: {v}" for k, v in sorted(cats.items(), key=lambda x: x[1], reverse=True)])
-        embed.add_field(name="📈 Por Categoria", value=f"```{cats_text}```", inline=False)
+        # Agrupa a página por categoria
+        categorias = {}
+        for categoria, jogo, status, qtd in self.linhas:
+            categorias.setdefault(categoria, []).append(f"{jogo[:80]} ({status}): {qtd}")
+        for cat, jogos in categorias.items():
+            embed.add_field(name=f"📂 {cat[:200]}", value="\n".join(jogos)[:1024], inline=False)
         
-        embed.set_footer(text="NyuxStore - Importação automática")
-        
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        embed.set_footer(text=f"NyuxStore - Página {self.pagina}")
+        return embed
+    
+    def _chave(self, linha):
+        return (linha[0], linha[1], linha[2])
+    
+    @discord.ui.button(label="⬅️ Anterior", style=discord.ButtonStyle.gray, disabled=True)
+    @medir("botao", "lista_anterior")
+    async def anterior(self, interaction: discord.Interaction, button: Button):
+        await self.carregar(antes=self._chave(self.linhas[0]))
+        self.pagina -= 1
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+    
+    @discord.ui.button(label="Próxima ➡️", style=discord.ButtonStyle.gray)
+    @medir("botao", "lista_proxima")
+    async def proxima(self, interaction: discord.Interaction, button: Button):
+        await self.carregar(depois=self._chave(self.linhas[-1]))
+        self.pagina += 1
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+    
+    @discord.ui.select(placeholder="📂 Filtrar por categoria")
+    @medir("select", "lista_filtro")
+    async def filtro(self, interaction: discord.Interaction, select: Select):
+        if select.values[0] in ("*anteriores", "*mais"):
+            # Só troca a página de categorias do select; a lista continua a mesma
+            self.pagina_categorias += 1 if select.values[0] == "*mais" else -1
+            self.montar_filtro()
+            return await interaction.response.edit_message(view=self)
+        self.categoria = None if select.values[0] == "*" else select.values[0]
+        self.pagina = 1
+        await self.carregar()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+COLUNAS_EXPORTACAO = ("id", "jogo", "categoria", "login", "senha", "status", "adicionado_em", "usado_por", "usado_em")
+
+def _data_filtro(texto, dias=0):
+    """"AAAA-MM-DD" → string comparável com os TIMESTAMP do SQLite; ValueError se inválida."""
+    data = datetime.strptime(texto.strip(), "%Y-%m-%d") + timedelta(days=dias)
+    return data.strftime("%Y-%m-%d %H:%M:%S")
+
+@bot.tree.command(name="exportar", description="[ADMIN] Exporta o estoque em CSV/JSONL comprimido")
+@app_commands.guild_only()
+@app_commands.describe(
+    status="Só contas com esse status",
+    categoria="Só essa categoria",
+    jogo="Parte do nome do jogo",
+    desde="Adicionadas a partir de (AAAA-MM-DD)",
+    ate="Adicionadas até (AAAA-MM-DD, inclusive)",
+    formato="Formato do arquivo"
+)
+@medir("comando", "exportar")
+async def exportar(
+    interaction: discord.Interaction,
+    status: Literal["disponivel", "usada"] = None,
+    categoria: str = None,
+    jogo: str = None,
+    desde: str = None,
+    ate: str = None,
+    formato: Literal["csv", "jsonl"] = "csv"
+):
+    if not await eh_admin(interaction):
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
+    
+    try:
+        desde = _data_filtro(desde) if desde else None
+        ate = _data_filtro(ate, dias=1) if ate else None
+    except ValueError:
+        return await interaction.response.send_message("❌ Data inválida! Use AAAA-MM-DD.", ephemeral=True)
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    
+    limite = interaction.guild.filesize_limit if interaction.guild else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+    exportador = ExportadorArquivos(COLUNAS_EXPORTACAO, formato, limite, nome_base=f"estoque_{datetime.now():%Y%m%d_%H%M}")
+    inicio = time.perf_counter()
+    try:
+        with metricas.cronometro("etapa_segundos", etapa="exportar"):
+            async for linhas in db.iterar_contas(interaction.guild_id, status, categoria and categoria.strip().title(), jogo and jogo.strip(), desde, ate):
+                # Comprimir é CPU: fora do event loop
+                await asyncio.to_thread(exportador.escrever, linhas)
+            partes = await asyncio.to_thread(exportador.finalizar)
+        metricas.incrementar("contas_exportadas_total", exportador.linhas)
         
-    except Exception as e:
-        await interaction.followup.send(f"❌ Erro: {str(e)}\n\nVerifique se o arquivo está no formato correto.", ephemeral=True)
+        tempo = time.perf_counter() - inicio
+        await interaction.followup.send(
+            f"📦 **{exportador.linhas} contas exportadas** em {len(partes)} arquivo(s) · {tempo:.1f}s",
+            ephemeral=True
+        )
+        # Uma parte por mensagem: o limite de upload vale para a mensagem inteira
+        for nome, arquivo in partes:
+            await interaction.followup.send(file=discord.File(arquivo, filename=nome), ephemeral=True)
+    finally:
+        exportador.descartar()
 
-@bot.tree.command(name="lista", description="[ADMIN] Mostra lista de todos os jogos")
-async def lista(interaction: discord.Interaction):
+@bot.tree.command(name="manutencao", description="[ADMIN] Arquiva contas/keys antigas e recupera espaço agora")
+@app_commands.guild_only()
+@medir("comando", "manutencao")
+async def manutencao(interaction: discord.Interaction):
+    # Mexe no banco de todos os servidores
     if interaction.user.id != ADMIN_ID:
         return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
     
     await interaction.response.defer(ephemeral=True, thinking=True)
+    anterior = await db.get_config('ultima_manutencao')
+    relatorio = await manutencao_banco()
     
-    contas = await db.get_todas_contas()
+    embed = discord.Embed(title="🧹 Manutenção do Banco", color=discord.Color.dark_teal(), timestamp=datetime.now())
+    embed.add_field(name="📦 Contas Arquivadas", value=str(relatorio['contas_arquivadas']), inline=True)
+    embed.add_field(name="🔑 Keys Arquivadas", value=str(relatorio['keys_arquivadas']), inline=True)
+    embed.add_field(name="💾 Espaço Recuperado", value=f"{relatorio['bytes_recuperados'] / 1024 / 1024:.1f} MB", inline=True)
+    embed.add_field(name="⏱️ Tempo", value=f"{relatorio['segundos']}s", inline=True)
+    if anterior:
+        embed.add_field(name="🕒 Execução Anterior", value=json.loads(anterior)['quando'], inline=True)
+    embed.set_footer(text=f"NyuxStore - arquiva o que foi usado há mais de {ARQUIVAR_APOS_DIAS} dias")
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="historico", description="[ADMIN] Contas e keys que um membro já pegou")
+@app_commands.guild_only()
+@app_commands.describe(membro="Membro a consultar")
+@medir("comando", "historico")
+async def historico(interaction: discord.Interaction, membro: discord.Member):
+    if not await eh_admin(interaction):
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
     
-    if not contas:
-        return await interaction.followup.send("❌ Nenhuma conta cadastrada!", ephemeral=True)
+    contas, keys = await db.historico_usuario(interaction.guild_id, membro.id)
+    embed = discord.Embed(title=f"📜 Histórico de {membro.display_name}", color=discord.Color.blue())
     
-    # Agrupa por categoria
-    categorias = {}
-    for categoria, jogo, login, senha, status in contas:
-        if categoria not in categorias:
-            categorias[categoria] = []
-        categorias[categoria].append(f"{jogo} ({status})")
+    def quando(valor):
+        return str(valor)[:16] if valor else "?"
     
-    # Cria embed
-    embed = discord.Embed(
-        title="📋 Lista de Jogos Cadastrados",
-        description=f"Total: {len(contas)} contas",
-        color=discord.Color.blue()
+    linhas_contas = "\n".join(
+        f"{'🗄️' if arquivada else '🎮'} {jogo[:40]} · `{login}` · {quando(usado_em)}"
+        for jogo, login, usado_em, arquivada in contas
+    )
+    linhas_keys = "\n".join(
+        f"{'🗄️' if arquivada else '🔑'} `{codigo}` · {duracao} · {cargo[:20]} · {quando(usado_em)}"
+        for codigo, duracao, cargo, usado_em, arquivada in keys
     )
+    embed.add_field(name="🎮 Contas", value=linhas_contas[:1024] or "Nenhuma", inline=False)
+    embed.add_field(name="🔑 Keys", value=linhas_keys[:1024] or "Nenhuma", inline=False)
+    embed.set_footer(text="NyuxStore - 🗄️ = arquivado")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="lista", description="[ADMIN] Mostra lista de todos os jogos")
+@app_commands.guild_only()
+@medir("comando", "lista")
+async def lista(interaction: discord.Interaction):
+    if not await eh_admin(interaction):
+        return await interaction.response.send_message("❌ Apenas dono!", ephemeral=True)
     
-    for cat, jogos in sorted(categorias.items()):
-        jogos_unicos = sorted(set(jogos))
-        valor = f"{len(jogos_unicos)} jogos"
-        if len(jogos_unicos) <= 5:
-            valor = ", ".join(jogos_unicos)
-        embed.add_field(name=f"📂 {cat}", value=valor, inline=True)
+    await interaction.response.defer(ephemeral=True, thinking=True)
     
-    await interaction.followup.send(embed=embed, ephemeral=True)
+    stats = await db.get_estatisticas(interaction.guild_id)
+    if not stats['total']:
+        return await interaction.followup.send("❌ Nenhuma conta cadastrada!", ephemeral=True)
+    
+    view = ListaView(interaction.guild_id, await db.get_categorias(interaction.guild_id), stats['total'])
+    await view.carregar()
+    await interaction.followup.send(embed=view.embed(), view=view, ephemeral=True)
+
+def main():
+    # Verifica se o token existe
+    if not TOKEN:
+        print("❌ ERRO: DISCORD_TOKEN não encontrado!")
+        print("Verifique se a variável está configurada na Railway.")
+        exit(1)
+    
+    print(f"✅ Token carregado: {TOKEN[:20]}...")
+    print(f"✅ Admin ID: {ADMIN_ID}")
+    print("🚀 Iniciando bot...")
+    bot.run(TOKEN)
 
-print("🚀 Iniciando bot...")
-bot.run(TOKEN)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Classificador de categorias dos jogos importados.
+
+As regras (termo → categoria, com prioridade) ficam no banco e são
+compiladas num único regex com limites de palavra, então cada título é
+classificado numa só passada e "cs" não casa mais com "Cities".
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+CATEGORIA_PADRAO = "Ação/Aventura"
+
+# Regras iniciais, na ordem de prioridade da antiga cadeia de if/elif
+REGRAS_PADRAO = [
+    (termo, categoria, prioridade)
+    for prioridade, (categoria, termos) in enumerate([
+        ("Corrida", ['car', 'cars', 'racing', 'forza', 'speed', 'truck', 'f1', 'corrida', 'nfs', 'grid']),
+        ("FPS/Tiro", ['call of duty', 'cod', 'cs', 'battlefield', 'war', 'tiro', 'fps', 'shooter']),
+        ("RPG/Aventura", ['assassin', 'witcher', 'elden', 'souls', 'rpg', 'final fantasy', 'dragon']),
+        ("Terror", ['resident evil', 'horror', 'fear', 'terror', 'evil', 'dead']),
+        ("Esportes", ['fifa', 'pes', 'nba', 'esporte', 'football', 'soccer']),
+        ("Simulador", ['simulator', 'simulation', 'tycoon', 'manager']),
+        ("Casual/Família", ['lego', 'minecraft', 'cartoon']),
+    ], start=1)
+    for termo in termos
+]
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e só com letras/dígitos separados por espaço."""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", texto).split())
+
+
+class Classificador:
+    def __init__(self, regras=REGRAS_PADRAO, padrao=CATEGORIA_PADRAO, cache=4096):
+        self._categoria_normalizada = lru_cache(maxsize=cache)(self._classificar)
+        self.carregar(regras, padrao)
+
+    def carregar(self, regras, padrao=CATEGORIA_PADRAO):
+        """Recompila as regras (termo, categoria, prioridade) e limpa o cache."""
+        por_termo = {}
+        for termo, categoria, prioridade in regras:
+            termo = normalizar(termo)
+            if termo and (termo not in por_termo or prioridade < por_termo[termo][0]):
+                por_termo[termo] = (prioridade, categoria)
+
+        # Termos mais longos primeiro, para "resident evil" ganhar de "evil"
+        termos = sorted(por_termo, key=len, reverse=True)
+        padrao_regex = r'\b(?:' + '|'.join(map(re.escape, termos)) + r')\b' if termos else r'(?!)'
+
+        # Uma atribuição só: o /importar classifica numa thread enquanto o admin recarrega
+        self._compilado = (re.compile(padrao_regex), por_termo, padrao)
+        self.total_regras = len(por_termo)
+        self._categoria_normalizada.cache_clear()
+
+    def _classificar(self, nome):
+        regex, por_termo, padrao = self._compilado
+        melhor = None
+        for m in regex.finditer(nome):
+            regra = por_termo[m.group()]
+            if melhor is None or regra[0] < melhor[0]:
+                melhor = regra
+        return melhor[1] if melhor else padrao
+
+    def categoria(self, jogo):
+        return self._categoria_normalizada(normalizar(jogo))
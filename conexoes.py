@@ -0,0 +1,206 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+# Pragmas aplicados em toda conexão aberta pelo pool
+PRAGMAS = (
+    # Só vale para banco novo e precisa vir antes do WAL; bancos antigos
+    # são convertidos pelo VACUUM da manutenção
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 134217728",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+class PoolConexoes:
+    """Conexões SQLite de vida longa: um escritor e um pool pequeno de leitores.
+
+    Cada conexão do aiosqlite roda numa thread própria; abrir uma por chamada
+    custava mais que as próprias queries. Aqui elas são abertas uma vez no
+    `setup_hook` e fechadas no `close` do bot.
+    """
+
+    def __init__(self, db_path, leitores=4, cache_statements=256, janela_commit=0.0, max_lote=256):
+        self.db_path = db_path
+        self.num_leitores = leitores
+        self.cache_statements = cache_statements
+        # Group commit: o que chega enquanto um commit está em andamento vai no
+        # próximo; janela_commit > 0 ainda espera um pouco por mais escritas
+        self.janela_commit = janela_commit
+        self.max_lote = max_lote
+        self._fila = None
+        self._tarefa_escritor = None
+        self.commits = 0
+        self.operacoes = 0
+        self._escritor = None
+        self._lock_escrita = asyncio.Lock()
+        self._leitores = None
+        self._todos_leitores = []
+        self._lock_abertura = asyncio.Lock()
+
+    @property
+    def aberto(self):
+        return self._escritor is not None
+
+    async def _conectar(self):
+        # isolation_level=None: as transações são controladas explicitamente
+        # em `escrita()`, e os leitores ficam em autocommit
+        conn = await aiosqlite.connect(
+            self.db_path,
+            isolation_level=None,
+            cached_statements=self.cache_statements,
+        )
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        return conn
+
+    async def abrir(self):
+        async with self._lock_abertura:
+            if self.aberto:
+                return
+            # O escritor abre primeiro para o WAL já estar ativo quando os leitores conectarem
+            self._escritor = await self._conectar()
+            self._leitores = asyncio.Queue()
+            for _ in range(self.num_leitores):
+                conn = await self._conectar()
+                self._todos_leitores.append(conn)
+                self._leitores.put_nowait(conn)
+            self._fila = asyncio.Queue()
+            self._tarefa_escritor = asyncio.create_task(self._escritor_loop())
+
+    async def fechar(self):
+        async with self._lock_abertura:
+            if not self.aberto:
+                return
+            # Termina o que já está na fila antes de fechar o escritor
+            await self._fila.join()
+            self._tarefa_escritor.cancel()
+            try:
+                await self._tarefa_escritor
+            except asyncio.CancelledError:
+                pass
+            self._tarefa_escritor = None
+            async with self._lock_escrita:
+                for conn in self._todos_leitores:
+                    await conn.close()
+                self._todos_leitores = []
+                self._leitores = None
+                await self._escritor.execute("PRAGMA optimize")
+                await self._escritor.close()
+                self._escritor = None
+
+    @asynccontextmanager
+    async def leitura(self):
+        """Empresta uma conexão de leitura (autocommit) do pool."""
+        if not self.aberto:
+            await self.abrir()
+        conn = await self._leitores.get()
+        try:
+            yield conn
+        finally:
+            self._leitores.put_nowait(conn)
+
+    @asynccontextmanager
+    async def escrita(self, imediata=False):
+        """Transação na conexão escritora; commit ao sair, rollback em erro."""
+        if not self.aberto:
+            await self.abrir()
+        async with self._lock_escrita:
+            conn = self._escritor
+            await conn.execute("BEGIN IMMEDIATE" if imediata else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
+
+    async def enfileirar(self, operacao):
+        """Executa `operacao(conn)` na fila de escrita e retorna o resultado dela.
+
+        As operações que chegam juntas são gravadas num único commit, cada uma
+        dentro de um SAVEPOINT: se uma falhar, só ela é desfeita e a exceção
+        volta para quem a enfileirou. O resultado só é entregue depois do
+        COMMIT, então uma leitura feita em seguida já enxerga a escrita.
+        `operacao` não pode usar `escrita()` nem `enfileirar()` (deadlock).
+        """
+        if not self.aberto:
+            await self.abrir()
+        futuro = asyncio.get_running_loop().create_future()
+        self._fila.put_nowait((operacao, futuro))
+        return await futuro
+
+    async def _escritor_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self._fila.get()]
+            prazo = loop.time() + self.janela_commit
+            while len(lote) < self.max_lote:
+                try:
+                    lote.append(self._fila.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self._fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._gravar_lote(lote)
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+    async def _gravar_lote(self, lote):
+        prontos = []
+        async with self._lock_escrita:
+            conn = self._escritor
+            try:
+                await conn.execute("BEGIN IMMEDIATE")
+                for operacao, futuro in lote:
+                    if futuro.cancelled():
+                        continue
+                    await conn.execute("SAVEPOINT operacao")
+                    try:
+                        resultado = await operacao(conn)
+                    except Exception as e:
+                        await conn.execute("ROLLBACK TO operacao")
+                        await conn.execute("RELEASE operacao")
+                        prontos.append((futuro, None, e))
+                    else:
+                        await conn.execute("RELEASE operacao")
+                        prontos.append((futuro, resultado, None))
+                await conn.commit()
+            except Exception as e:
+                # Falha do BEGIN/COMMIT: nada do lote foi gravado
+                if conn.in_transaction:
+                    await conn.rollback()
+                prontos = [(futuro, None, e) for _, futuro in lote]
+        self.commits += 1
+        self.operacoes += len(lote)
+
+        for futuro, resultado, erro in prontos:
+            if futuro.done():
+                continue
+            if erro is not None:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(resultado)
+
+    @asynccontextmanager
+    async def sem_transacao(self):
+        """Conexão escritora em autocommit, para VACUUM e PRAGMAs que não rodam dentro de BEGIN."""
+        if not self.aberto:
+            await self.abrir()
+        async with self._lock_escrita:
+            yield self._escritor
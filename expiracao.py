@@ -0,0 +1,115 @@
+"""Expiração dos cargos dados por keys.
+
+As assinaturas ativas ficam num min-heap em memória ordenado por
+`expira_em`; uma única tarefa dorme até a próxima expiração e entrega os
+vencidos em lotes para o callback, que tira os cargos. O que o callback
+não conseguir tirar volta para o heap com espera exponencial (1 min, 2 min,
+4 min... até `espera_falha`), para um 403 permanente não virar uma chamada
+por minuto para sempre.
+"""
+import asyncio
+import heapq
+import re
+import time
+
+# 7d, 2s (semanas), 1m (mês), 1a (ano), 12h
+UNIDADES = {
+    'h': 3600,
+    'd': 86400,
+    's': 7 * 86400,
+    'm': 30 * 86400,
+    'a': 365 * 86400,
+}
+DURACAO = re.compile(r'^\s*(\d+)\s*([hdsma])\s*$', re.IGNORECASE)
+VITALICIO = {'lifetime', 'vitalicio', 'vitalício', 'permanente'}
+
+
+def duracao_em_segundos(duracao):
+    """Converte "7d", "1m", "1a"... em segundos; None para lifetime.
+
+    Levanta ValueError se o formato não for reconhecido.
+    """
+    texto = duracao.strip().lower()
+    if texto in VITALICIO:
+        return None
+    m = DURACAO.match(texto)
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Duração inválida: {duracao}")
+    return int(m.group(1)) * UNIDADES[m.group(2).lower()]
+
+
+class AgendadorExpiracao:
+    def __init__(self, expirar, lote=100, espera_maxima=3600, espera_falha=6 * 3600):
+        # expirar(ids, agora) recebe um lote de ids de assinaturas vencidas e
+        # retorna os que falharam
+        self.expirar = expirar
+        self.lote = lote
+        self.espera_maxima = espera_maxima
+        self.espera_falha = espera_falha
+        self._heap = []
+        self._tentativas = {}  # assinatura_id -> falhas seguidas
+        self._acordar = asyncio.Event()
+        self._tarefa = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def carregar(self, pendentes):
+        """Reconstrói o heap a partir de (expira_em, assinatura_id)."""
+        self._heap = list(pendentes)
+        heapq.heapify(self._heap)
+        self._tentativas.clear()
+        self._acordar.set()
+
+    def agendar(self, expira_em, assinatura_id):
+        heapq.heappush(self._heap, (expira_em, assinatura_id))
+        # Só precisa acordar a tarefa se a próxima expiração mudou
+        if self._heap[0] == (expira_em, assinatura_id):
+            self._acordar.set()
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _executar(self):
+        while True:
+            self._acordar.clear()
+            if not self._heap:
+                await self._acordar.wait()
+                continue
+
+            espera = self._heap[0][0] - time.time()
+            if espera > 0:
+                # Acorda antes se alguém agendar algo mais cedo; o teto protege contra ajuste de relógio
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), timeout=min(espera, self.espera_maxima))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            agora = time.time()
+            vencidos = []
+            while self._heap and self._heap[0][0] <= agora and len(vencidos) < self.lote:
+                vencidos.append(heapq.heappop(self._heap))
+            try:
+                falhas = await self.expirar([assinatura_id for _, assinatura_id in vencidos], agora)
+            except Exception as e:
+                print(f"❌ Erro ao expirar assinaturas: {e}")
+                falhas = [assinatura_id for _, assinatura_id in vencidos]
+            falhas = set(falhas or ())
+            for _, assinatura_id in vencidos:
+                if assinatura_id not in falhas:
+                    self._tentativas.pop(assinatura_id, None)
+            for assinatura_id in falhas:
+                n = self._tentativas.get(assinatura_id, 0)
+                self._tentativas[assinatura_id] = n + 1
+                heapq.heappush(self._heap, (agora + min(60 * 2 ** n, self.espera_falha), assinatura_id))
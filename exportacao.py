@@ -0,0 +1,76 @@
+"""Exportação do estoque em CSV/JSONL comprimido, sem montar tudo na memória.
+
+As linhas chegam em lotes, são escritas num gzip sobre um SpooledTemporaryFile
+(memória até alguns MB, disco depois disso) e o arquivo é cortado em partes
+independentes para cada uma caber no limite de upload do Discord.
+"""
+import csv
+import gzip
+import io
+import json
+import tempfile
+
+# O gzip segura parte da saída comprimida no buffer; a margem cobre isso
+MARGEM_BYTES = 512 * 1024
+MEMORIA_SPOOL = 4 * 1024 * 1024
+
+
+class ExportadorArquivos:
+    def __init__(self, colunas, formato="csv", limite_bytes=10 * 1024 * 1024, nome_base="estoque"):
+        if formato not in ("csv", "jsonl"):
+            raise ValueError(f"Formato inválido: {formato}")
+        self.colunas = list(colunas)
+        self.formato = formato
+        self.limite = max(limite_bytes - MARGEM_BYTES, 64 * 1024)
+        self.nome_base = nome_base
+        self.partes = []
+        self.linhas = 0
+        self._arquivo = None
+        self._gzip = None
+        self._texto = None
+        self._csv = None
+
+    def _abrir_parte(self):
+        self._arquivo = tempfile.SpooledTemporaryFile(max_size=MEMORIA_SPOOL)
+        self._gzip = gzip.GzipFile(fileobj=self._arquivo, mode="wb", compresslevel=6)
+        self._texto = io.TextIOWrapper(self._gzip, encoding="utf-8", newline="")
+        if self.formato == "csv":
+            self._csv = csv.writer(self._texto)
+            self._csv.writerow(self.colunas)
+
+    def _fechar_parte(self):
+        self._texto.close()  # fecha o gzip junto, mas não o arquivo de baixo
+        self._arquivo.seek(0)
+        numero = len(self.partes) + 1
+        self.partes.append((f"{self.nome_base}_{numero:02d}.{self.formato}.gz", self._arquivo))
+        self._arquivo = self._gzip = self._texto = self._csv = None
+
+    def escrever(self, linhas):
+        """Acrescenta um lote de linhas; chamado numa thread (comprimir é CPU)."""
+        for linha in linhas:
+            if self._arquivo is None:
+                self._abrir_parte()
+            if self.formato == "csv":
+                self._csv.writerow(linha)
+            else:
+                self._texto.write(json.dumps(dict(zip(self.colunas, linha)), ensure_ascii=False, default=str))
+                self._texto.write("\n")
+            self.linhas += 1
+            # tell() do arquivo de baixo = bytes comprimidos já gravados
+            if self._arquivo.tell() >= self.limite:
+                self._fechar_parte()
+
+    def finalizar(self):
+        """Fecha a parte atual e retorna [(nome, arquivo)] prontos para envio."""
+        if self._arquivo is not None or not self.partes:
+            if self._arquivo is None:
+                self._abrir_parte()  # exportação vazia ainda gera um arquivo com cabeçalho
+            self._fechar_parte()
+        return self.partes
+
+    def descartar(self):
+        if self._texto is not None:
+            self._texto.close()
+            self._arquivo.close()
+        for _, arquivo in self.partes:
+            arquivo.close()
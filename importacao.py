@@ -0,0 +1,143 @@
+"""Importações de contas em segundo plano.
+
+Cada /importar vira um job salvo no banco (tabela importacoes) com o arquivo
+e o cursor do último bloco gravado. Um worker pega os jobs em ordem, faz o
+parse num processo separado (a regex não disputa o GIL com o event loop),
+grava em blocos devolvendo o loop entre um e outro e avisa o progresso de
+tempos em tempos. Cancelar vale no fim do bloco atual. Na subida, os jobs
+que estavam na fila ou rodando voltam e continuam do cursor.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from parser_contas import listar_contas
+
+ABERTOS = ('pendente', 'rodando')
+
+
+class ExecutorImportacoes:
+    def __init__(self, db, gravar, avisar, tamanho_bloco=1000, intervalo=3.0, metricas=None):
+        # gravar(guild_id, [(jogo, login, senha)]) -> (adicionadas, duplicadas, erros)
+        # avisar(job, contas) atualiza a mensagem; `contas` só vem no aviso final
+        self.db = db
+        self.gravar = gravar
+        self.avisar = avisar
+        self.tamanho_bloco = tamanho_bloco
+        self.intervalo = intervalo
+        self.metricas = metricas
+        self._fila = asyncio.Queue()
+        self._cancelados = set()
+        self._atual = None
+        self._processos = None
+        self._tarefa = None
+
+    def enfileirar(self, importacao_id):
+        self._fila.put_nowait(importacao_id)
+
+    async def cancelar(self, importacao_id):
+        """Pede o cancelamento; o job em andamento para no fim do bloco atual."""
+        self._cancelados.add(importacao_id)
+        if importacao_id != self._atual:
+            await self.db.terminar_importacao(importacao_id, 'cancelada')
+            await self._avisar(await self.db.get_importacao(importacao_id))
+
+    async def aguardar(self):
+        """Espera a fila esvaziar (benchmark e testes)."""
+        await self._fila.join()
+
+    def iniciar(self):
+        if self._processos is None:
+            # spawn: o processo filho não herda as threads do aiosqlite/discord
+            self._processos = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        if self._processos:
+            # Sem esperar: um parse em andamento travaria o event loop até acabar.
+            # O job fica 'rodando' e recomeça do cursor na próxima subida.
+            self._processos.shutdown(wait=False, cancel_futures=True)
+            self._processos = None
+
+    async def _executar(self):
+        while True:
+            importacao_id = await self._fila.get()
+            self._atual = importacao_id
+            try:
+                await self._processar(importacao_id)
+            except Exception as e:
+                print(f"❌ Erro na importação #{importacao_id}: {e}")
+                await self.db.terminar_importacao(importacao_id, 'erro')
+                await self._avisar(await self.db.get_importacao(importacao_id))
+            finally:
+                self._atual = None
+                self._cancelados.discard(importacao_id)
+                self._fila.task_done()
+
+    async def _avisar(self, job, contas=None):
+        if job is None:
+            return
+        try:
+            await self.avisar(job, contas)
+        except Exception as e:
+            # Mensagem apagada/sem permissão não pode derrubar a importação
+            print(f"⚠️ Não foi possível atualizar o progresso da importação #{job['id']}: {e}")
+
+    async def _parsear(self, conteudo):
+        inicio = time.perf_counter()
+        contas = await asyncio.get_running_loop().run_in_executor(self._processos, listar_contas, conteudo)
+        if self.metricas:
+            self.metricas.observar("etapa_segundos", time.perf_counter() - inicio, etapa="importar_parse")
+        return contas
+
+    async def _processar(self, importacao_id):
+        job = await self.db.get_importacao(importacao_id)
+        if job is None or job['status'] not in ABERTOS or importacao_id in self._cancelados:
+            return
+        conteudo = await self.db.get_arquivo_importacao(importacao_id)
+        if conteudo is None:
+            raise ValueError("arquivo da importação não encontrado")
+
+        contas = await self._parsear(conteudo)
+        del conteudo
+        job.update(status='rodando', total=len(contas))
+        await self.db.atualizar_importacao(importacao_id, status='rodando', total=len(contas))
+        await self._avisar(job)
+
+        # Retomada: os blocos até `processadas` já foram gravados. Se o processo caiu
+        # entre o commit de um bloco e o do cursor, ele é refeito e o hash das contas
+        # o transforma em "já cadastradas".
+        ultimo_aviso = time.monotonic()
+        for inicio in range(job['processadas'], len(contas), self.tamanho_bloco):
+            if importacao_id in self._cancelados:
+                job['status'] = 'cancelada'
+                break
+            bloco = contas[inicio:inicio + self.tamanho_bloco]
+            adicionadas, duplicadas, erros = await self.gravar(job['guild_id'], bloco)
+            job['processadas'] = inicio + len(bloco)
+            job['adicionadas'] += adicionadas
+            job['duplicadas'] += duplicadas
+            job['erros'] += erros
+            await self.db.atualizar_importacao(
+                importacao_id, processadas=job['processadas'], adicionadas=job['adicionadas'],
+                duplicadas=job['duplicadas'], erros=job['erros']
+            )
+            if time.monotonic() - ultimo_aviso >= self.intervalo:
+                await self._avisar(job)
+                ultimo_aviso = time.monotonic()
+            # Devolve o loop entre blocos: interações não esperam a importação inteira
+            await asyncio.sleep(0)
+        else:
+            job['status'] = 'concluida'
+
+        await self.db.terminar_importacao(importacao_id, job['status'])
+        await self._avisar(job, contas)
@@ -0,0 +1,130 @@
+"""Limite de taxa em memória para as ações que batem no banco.
+
+Token bucket por usuário e por ação (custom_id), um bucket global por
+ação e um teto de handlers simultâneos. Buckets ociosos são descartados
+periodicamente para a memória não crescer com o número de usuários.
+"""
+import asyncio
+import functools
+import math
+import time
+
+
+class Bucket:
+    __slots__ = ("tokens", "atualizado")
+
+    def __init__(self, capacidade, agora):
+        self.tokens = capacidade
+        self.atualizado = agora
+
+    def consumir(self, capacidade, por_segundo, agora):
+        """Tenta gastar um token; retorna 0 ou os segundos até o próximo token."""
+        self.tokens = min(capacidade, self.tokens + (agora - self.atualizado) * por_segundo)
+        self.atualizado = agora
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / por_segundo
+
+    def devolver(self, capacidade):
+        self.tokens = min(capacidade, self.tokens + 1)
+
+
+class Limitador:
+    def __init__(self, regras=None, padrao=(10, 1.0), max_concorrencia=16, espera_concorrencia=2.0, ocioso=600):
+        # regras: acao -> {"usuario": (capacidade, tokens/s), "global": (capacidade, tokens/s)}
+        self.regras = regras or {}
+        self.padrao = padrao
+        self.ocioso = ocioso
+        self.espera_concorrencia = espera_concorrencia
+        self._buckets = {}
+        self._globais = {}
+        self._semaforo = asyncio.Semaphore(max_concorrencia)
+        self._ultima_limpeza = time.monotonic()
+
+    def consumir(self, user_id, acao):
+        """Retorna 0 se a ação pode seguir, ou quantos segundos o usuário deve esperar."""
+        agora = time.monotonic()
+        if agora - self._ultima_limpeza > self.ocioso:
+            self.limpar(agora)
+
+        # O usuário é conferido antes: quem já estourou o próprio limite não gasta
+        # o bucket global e não tira a vez dos outros
+        regra = self.regras.get(acao, {})
+        capacidade, por_segundo = regra.get("usuario", self.padrao)
+        chave = (user_id, acao)
+        bucket = self._buckets.get(chave)
+        if bucket is None:
+            bucket = self._buckets[chave] = Bucket(capacidade, agora)
+        espera = bucket.consumir(capacidade, por_segundo, agora)
+        if espera:
+            return espera
+
+        limite_global = regra.get("global")
+        if limite_global:
+            bucket_global = self._globais.get(acao)
+            if bucket_global is None:
+                bucket_global = self._globais[acao] = Bucket(limite_global[0], agora)
+            espera = bucket_global.consumir(*limite_global, agora)
+            if espera:
+                bucket.devolver(capacidade)
+                return espera
+        return 0.0
+
+    def devolver(self, user_id, acao):
+        """Devolve os tokens de uma ação que passou no limite mas não chegou a rodar."""
+        regra = self.regras.get(acao, {})
+        bucket = self._buckets.get((user_id, acao))
+        if bucket is not None:
+            bucket.devolver(regra.get("usuario", self.padrao)[0])
+        limite_global = regra.get("global")
+        if limite_global and acao in self._globais:
+            self._globais[acao].devolver(limite_global[0])
+
+    def limpar(self, agora=None):
+        """Descarta buckets sem uso há mais de `ocioso` segundos (já estariam cheios)."""
+        agora = agora if agora is not None else time.monotonic()
+        limite = agora - self.ocioso
+        for chave in [c for c, b in self._buckets.items() if b.atualizado < limite]:
+            del self._buckets[chave]
+        self._ultima_limpeza = agora
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def entrar(self):
+        """Ocupa uma vaga de concorrência; False se o bot estiver cheio demais."""
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera_concorrencia)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def sair(self):
+        self._semaforo.release()
+
+    def limitado(self, acao, metodo=True):
+        """Decorator para `on_submit`/callbacks que recebem (self, interaction, ...).
+
+        Com `metodo=False` serve para comandos de barra, que recebem (interaction, ...).
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                interaction = args[1] if metodo else args[0]
+                espera = self.consumir(interaction.user.id, acao)
+                if espera:
+                    return await interaction.response.send_message(
+                        f"⏳ Muitas tentativas! Tente novamente em {math.ceil(espera)}s.", ephemeral=True
+                    )
+                if not await self.entrar():
+                    self.devolver(interaction.user.id, acao)
+                    return await interaction.response.send_message(
+                        "🚦 O bot está ocupado agora, tente de novo em alguns segundos.", ephemeral=True
+                    )
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.sair()
+            return wrapper
+        return decorator
@@ -0,0 +1,70 @@
+"""Manutenção do banco em horário de pouco movimento.
+
+Uma tarefa dorme até o início da janela configurada (no fuso da loja), roda
+o callback uma vez por dia e passa o fim da janela como prazo, para que o
+arquivamento pare de pegar lotes novos quando o movimento volta.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+
+class AgendadorManutencao:
+    def __init__(self, executar, fuso, hora_inicio=3, hora_fim=5):
+        # executar(prazo) recebe o time.monotonic() em que a janela acaba
+        self.executar = executar
+        self.fuso = fuso
+        self.hora_inicio = hora_inicio
+        self.hora_fim = hora_fim
+        self._ultimo_dia = None
+        self._tarefa = None
+
+    def _agora(self):
+        return datetime.now(self.fuso).replace(tzinfo=None)
+
+    def _limites(self, dia):
+        inicio = datetime.combine(dia, datetime.min.time()) + timedelta(hours=self.hora_inicio)
+        fim = datetime.combine(dia, datetime.min.time()) + timedelta(hours=self.hora_fim)
+        if fim <= inicio:  # janela que cruza a meia-noite, ex: 23-2
+            fim += timedelta(days=1)
+        return inicio, fim
+
+    def segundos_ate_janela(self, agora=None):
+        """0 se estamos numa janela que ainda não rodou hoje, senão quanto falta para a próxima."""
+        agora = agora or self._agora()
+        for dia in (agora.date() - timedelta(days=1), agora.date(), agora.date() + timedelta(days=1)):
+            inicio, fim = self._limites(dia)
+            if fim <= agora or dia == self._ultimo_dia:
+                continue
+            return max(0.0, (inicio - agora).total_seconds())
+        return 86400.0
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _executar(self):
+        while True:
+            espera = self.segundos_ate_janela()
+            if espera > 0:
+                # Dorme no máximo 1h por vez para não depender de um sleep longo com o relógio mudando
+                await asyncio.sleep(min(espera, 3600))
+                continue
+
+            agora = self._agora()
+            dia = agora.date() if self._limites(agora.date())[0] <= agora else agora.date() - timedelta(days=1)
+            self._ultimo_dia = dia
+            prazo = time.monotonic() + (self._limites(dia)[1] - agora).total_seconds()
+            try:
+                await self.executar(prazo)
+            except Exception as e:
+                print(f"❌ Erro na manutenção do banco: {e}")
@@ -0,0 +1,187 @@
+"""Métricas de latência e vazão do bot.
+
+Histogramas com buckets fixos (formato Prometheus), contadores e gauges em
+memória, exportados em texto Prometheus por um endpoint HTTP local no
+aiohttp que já vem com o discord.py.
+"""
+import asyncio
+import bisect
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+# Limites superiores dos buckets, em segundos
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histograma:
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)  # o último é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(BUCKETS, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def quantil(self, q):
+        """Estimativa do quantil por interpolação linear no bucket (como o histogram_quantile)."""
+        if not self.total:
+            return 0.0
+        alvo = q * self.total
+        acumulado = 0
+        for i, contagem in enumerate(self.contagens):
+            if acumulado + contagem >= alvo and contagem:
+                if i == len(BUCKETS):
+                    return BUCKETS[-1]
+                inferior = BUCKETS[i - 1] if i else 0.0
+                return inferior + (BUCKETS[i] - inferior) * (alvo - acumulado) / contagem
+            acumulado += contagem
+        return BUCKETS[-1]
+
+
+def _rotulos(labels):
+    if not labels:
+        return ""
+    partes = []
+    for chave, valor in labels:
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{chave}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+
+class Metricas:
+    def __init__(self, prefixo="nyux"):
+        self.prefixo = prefixo
+        self.histogramas = {}
+        self.contadores = {}
+        self.gauges = {}
+        self._runner = None
+        self._tarefa_loop = None
+
+    # Registro
+
+    def observar(self, metrica, segundos, **labels):
+        chave = (metrica, tuple(sorted(labels.items())))
+        histograma = self.histogramas.get(chave)
+        if histograma is None:
+            histograma = self.histogramas[chave] = Histograma()
+        histograma.observar(segundos)
+
+    def incrementar(self, metrica, valor=1, **labels):
+        chave = (metrica, tuple(sorted(labels.items())))
+        self.contadores[chave] = self.contadores.get(chave, 0) + valor
+
+    def definir(self, metrica, valor, **labels):
+        self.gauges[(metrica, tuple(sorted(labels.items())))] = valor
+
+    @contextmanager
+    def cronometro(self, metrica, **labels):
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.incrementar("erros_total", **labels)
+            raise
+        finally:
+            self.observar(metrica, time.perf_counter() - inicio, **labels)
+
+    def medir(self, metrica, **labels):
+        """Decorator que mede a duração de uma coroutine."""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.cronometro(metrica, **labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrumentar(self, cls, metrica, label):
+        """Mede todos os métodos async públicos de `cls`, rotulados pelo nome do método."""
+        for metodo, func in list(vars(cls).items()):
+            if not metodo.startswith("_") and inspect.iscoroutinefunction(func):
+                setattr(cls, metodo, self.medir(metrica, **{label: metodo})(func))
+        return cls
+
+    # Leitura
+
+    def resumo(self, metrica):
+        """[(labels, p50, p95, p99, total)] de um histograma, mais lentos primeiro."""
+        linhas = [
+            (dict(labels), h.quantil(0.5), h.quantil(0.95), h.quantil(0.99), h.total)
+            for (nome, labels), h in self.histogramas.items() if nome == metrica
+        ]
+        return sorted(linhas, key=lambda linha: linha[3], reverse=True)
+
+    def prometheus(self):
+        saida = []
+        por_nome = {}
+        for (nome, labels), h in self.histogramas.items():
+            por_nome.setdefault(nome, []).append((labels, h))
+        for nome, series in sorted(por_nome.items()):
+            metrica = f"{self.prefixo}_{nome}"
+            saida.append(f"# TYPE {metrica} histogram")
+            for labels, h in series:
+                acumulado = 0
+                for limite, contagem in zip(BUCKETS + ("+Inf",), h.contagens):
+                    acumulado += contagem
+                    saida.append(f"{metrica}_bucket{_rotulos(labels + (('le', limite),))} {acumulado}")
+                saida.append(f"{metrica}_sum{_rotulos(labels)} {h.soma}")
+                saida.append(f"{metrica}_count{_rotulos(labels)} {h.total}")
+
+        for tipo, valores in (("counter", self.contadores), ("gauge", self.gauges)):
+            vistos = set()
+            for (nome, labels), valor in sorted(valores.items()):
+                metrica = f"{self.prefixo}_{nome}"
+                if metrica not in vistos:
+                    saida.append(f"# TYPE {metrica} {tipo}")
+                    vistos.add(metrica)
+                saida.append(f"{metrica}{_rotulos(labels)} {valor}")
+        return "\n".join(saida) + "\n"
+
+    # Tarefas de fundo
+
+    async def _monitorar_loop(self, intervalo):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(intervalo)
+            atraso = max(0.0, time.perf_counter() - inicio - intervalo)
+            self.observar("loop_lag_segundos", atraso)
+            self.definir("loop_lag_atual_segundos", atraso)
+
+    async def _responder(self, request):
+        return web.Response(text=self.prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def iniciar(self, host="127.0.0.1", porta=9100, intervalo_loop=0.5):
+        """Começa a medir o atraso do event loop e, se `porta` for truthy, sobe o /metrics.
+
+        Se a porta estiver ocupada, só avisa: o bot sobe sem o endpoint.
+        """
+        if self._tarefa_loop is None:
+            self._tarefa_loop = asyncio.create_task(self._monitorar_loop(intervalo_loop))
+        if porta and self._runner is None:
+            app = web.Application()
+            app.router.add_get("/metrics", self._responder)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            try:
+                await web.TCPSite(self._runner, host, porta).start()
+            except OSError as e:
+                # Porta ocupada não pode impedir o bot de subir: fica sem /metrics
+                print(f"⚠️ /metrics desativado, não foi possível abrir {host}:{porta}: {e}")
+                await self._runner.cleanup()
+                self._runner = None
+
+    async def parar(self):
+        if self._tarefa_loop:
+            self._tarefa_loop.cancel()
+            self._tarefa_loop = None
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None